@@ -0,0 +1,83 @@
+import time
+import random
+import argparse
+from scripts.cve.cvss import parse_vector
+
+# A day of NVD vectors is a few hundred distinct strings repeated many times:
+SAMPLE_VECTORS = [
+    "AV:N/AC:L/Au:N/C:P/I:P/A:P",
+    "AV:N/AC:M/Au:N/C:C/I:C/A:C",
+    "CVSS:3.0/AV:N/AC:L/PR:N/UI:R/S:U/C:H/I:H/A:H",
+    "CVSS:3.1/AV:N/AC:L/PR:N/UI:N/S:U/C:H/I:H/A:H",
+    "CVSS:3.1/AV:N/AC:L/PR:L/UI:N/S:U/C:H/I:H/A:H",
+    "CVSS:3.1/AV:L/AC:L/PR:L/UI:N/S:U/C:H/I:H/A:H/E:P",
+    "CVSS:4.0/AV:N/AC:L/AT:N/PR:N/UI:N/VC:H/VI:H/VA:H/SC:N/SI:N/SA:N",
+    "CVSS:4.0/AV:N/AC:L/AT:N/PR:L/UI:N/VC:H/VI:H/VA:H/SC:N/SI:N/SA:N/E:A",
+]
+
+
+def legacy_generate_report(vector_string):
+    # The per-call parser nvd_api used before scripts/cve/cvss.py:
+    mapping = {
+        "AV": {"N": "NETWORK", "A": "ADJACENT", "L": "LOCAL", "P": "PHYSICAL"},
+        "PR": {"N": "NONE", "L": "LOW", "H": "HIGH"},
+        "AC": {"L": "LOW", "H": "HIGH"},
+        "E": {
+            "X": "NOT_DEFINED",
+            "U": "UNPROVEN",
+            "P": "PROOF_OF_CONCEPT",
+            "A": "ATTACKED",
+        },
+        "VC": {"H": "HIGH", "L": "LOW", "N": "NONE"},
+        "VI": {"H": "HIGH", "L": "LOW", "N": "NONE"},
+        "VA": {"H": "HIGH", "L": "LOW", "N": "NONE"},
+    }
+    parts = {
+        p.split(":")[0]: p.split(":")[1] for p in vector_string.split("/") if ":" in p
+    }
+    return {
+        "authRequired": mapping["PR"].get(parts.get("PR"), "Unknown"),
+        "attackVector": mapping["AV"].get(parts.get("AV"), "Unknown"),
+        "complexity": mapping["AC"].get(parts.get("AC"), "Unknown"),
+        "exploitState": mapping["E"].get(parts.get("E"), "Unknown"),
+        "confidentiality": mapping["VC"].get(parts.get("VC"), "Unknown"),
+        "integrity": mapping["VI"].get(parts.get("VI"), "Unknown"),
+        "availability": mapping["VA"].get(parts.get("VA"), "Unknown"),
+    }
+
+
+def make_vectors(count, distinct, seed=0):
+    # distinct variants of the samples, shuffled into count vectors:
+    rng = random.Random(seed)
+    pool = [
+        f"{SAMPLE_VECTORS[i % len(SAMPLE_VECTORS)]}/X{i}:N" for i in range(distinct)
+    ]
+    return [rng.choice(pool) for _ in range(count)]
+
+
+def timed(label, parse, vectors):
+    startedAt = time.perf_counter()
+    for vector in vectors:
+        parse(vector)
+    seconds = time.perf_counter() - startedAt
+    print(f"{label:<12} {seconds:8.3f}s  {len(vectors) / seconds:12,.0f} vectors/s")
+    return seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CVSS vector parsing throughput")
+    parser.add_argument("--count", type=int, default=300_000)
+    parser.add_argument("--distinct", type=int, default=500)
+    args = parser.parse_args()
+
+    vectors = make_vectors(args.count, args.distinct)
+    print(f"{args.count:,} vectors, {args.distinct:,} distinct")
+    timed("legacy", legacy_generate_report, vectors)
+    timed("uncached", parse_vector.__wrapped__, vectors)
+    parse_vector.cache_clear()
+    timed("cached", parse_vector, vectors)
+    print(f"cache: {parse_vector.cache_info()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import os
+import re
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+from scripts.runner import SOURCES
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENTRY_POINTS = ("scripts.runner", *(spec.split(":")[0] for spec in SOURCES.values()))
+# Dependencies a run should only pay for once a stage needs them:
+LAZY_PACKAGES = ("bs4", "lxml", "pymongo", "telegram", "deep_translator", "PIL")
+
+IMPORT_TIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \| (.*)$")
+
+
+def run_importtime(code):
+    # (self us, cumulative us, module) of every import the code triggers:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT_DIR,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return [
+        (int(match[1]), int(match[2]), match[3].strip())
+        for match in map(IMPORT_TIME_LINE.match, result.stderr.splitlines())
+        if match
+    ]
+
+
+def startup_modules():
+    # Imported by the interpreter itself, before any entry point code runs:
+    return {name for _, _, name in run_importtime("import importlib")}
+
+
+def import_times(module, startup):
+    # (total us, {root package: self us}) of one cold import of the module.
+    # import_module, "as" is a keyword so `import scripts.real_madrid.as` fails:
+    packages = {}
+    total = 0
+    for selfTime, _, name in run_importtime(
+        f"import importlib; importlib.import_module({module!r})"
+    ):
+        if name in startup:
+            continue
+        root = name.split(".")[0]
+        packages[root] = packages.get(root, 0) + selfTime
+        total += selfTime
+    return total, packages
+
+
+def bench_entry_point(module, runs, top, startup):
+    samples = [import_times(module, startup) for _ in range(runs)]
+    totals = [total for total, _ in samples]
+    # Median self time per package across the runs:
+    names = set().union(*(packages for _, packages in samples))
+    packages = {
+        name: statistics.median(packages.get(name, 0) for _, packages in samples)
+        for name in names
+    }
+    heaviest = sorted(packages.items(), key=lambda item: item[1], reverse=True)
+    return {
+        "module": module,
+        "median_ms": statistics.median(totals) / 1000,
+        "min_ms": min(totals) / 1000,
+        "eager_packages": [name for name in LAZY_PACKAGES if name in packages],
+        "packages_ms": {name: value / 1000 for name, value in heaviest[:top]},
+    }
+
+
+def print_result(result):
+    eager = ", ".join(result["eager_packages"]) or "none"
+    print(
+        f"\n{result['module']}: median {result['median_ms']:.1f}ms, "
+        f"min {result['min_ms']:.1f}ms, heavy packages loaded: {eager}"
+    )
+    for name, value in result["packages_ms"].items():
+        print(f"  {name:<20} {value:8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Cold import cost of each entry point, from python -X importtime"
+    )
+    parser.add_argument(
+        "modules", nargs="*", help=f"default: {', '.join(ENTRY_POINTS)}"
+    )
+    parser.add_argument("--runs", type=int, default=5, help="cold imports per module")
+    parser.add_argument("--top", type=int, default=8, help="packages shown per module")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    startup = startup_modules()
+    results = []
+    for module in args.modules or ENTRY_POINTS:
+        result = bench_entry_point(module, args.runs, args.top, startup)
+        print_result(result)
+        results.append(result)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as jsonFile:
+            json.dump(results, jsonFile, indent=2)
+
+
+if __name__ == "__main__":
+    main()
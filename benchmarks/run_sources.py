@@ -0,0 +1,234 @@
+import io
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import contextlib
+import tracemalloc
+from benchmarks.standins import StandIns
+
+SOURCES = ("gate_ahram", "as", "marca", "official_news", "nvd_api")
+STAGES = (
+    "fetch_listing",
+    "get_items",
+    "prepare_item",
+    "claim_item",
+    "send_item",
+    "send_items",
+    "persist_items",
+)
+
+
+class StageTimer:
+    # Wall time of every call to the wrapped Source methods:
+    def __init__(self):
+        self.samples = {stage: [] for stage in STAGES}
+
+    def wrap(self, source, stage):
+        method = getattr(source, stage)
+        samples = self.samples[stage]
+        if asyncio.iscoroutinefunction(method):
+
+            async def timed(*args, **kwargs):
+                startedAt = time.perf_counter()
+                try:
+                    return await method(*args, **kwargs)
+                finally:
+                    samples.append(time.perf_counter() - startedAt)
+
+        else:
+
+            def timed(*args, **kwargs):
+                startedAt = time.perf_counter()
+                try:
+                    return method(*args, **kwargs)
+                finally:
+                    samples.append(time.perf_counter() - startedAt)
+
+        setattr(source, stage, timed)
+
+    def report(self):
+        report = {}
+        for stage, samples in self.samples.items():
+            if not samples:
+                continue
+            ordered = sorted(samples)
+            report[stage] = {
+                "calls": len(samples),
+                "mean_ms": sum(samples) / len(samples) * 1000,
+                "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+                * 1000,
+                "total_ms": sum(samples) * 1000,
+            }
+        return report
+
+
+def configure_env(standIns, stateDir, args):
+    # Before any shared module is imported, they read their settings on import:
+    os.environ.update(
+        STATE_DIR=stateDir,
+        TRANSLATION_BACKEND="local",
+        TRANSLATION_LOCAL_DELAY=str(args.translation_latency),
+        TELEGRAM_API_URL=standIns.url,
+        TELEGRAM_TOKEN_MASR_NEWS="1:bench",
+        TELEGRAM_TOKEN_REAL_MADRID="2:bench",
+        TELEGRAM_TOKEN_CVE="3:bench",
+        TELEGRAM_CHAT_ID="-100",
+        NVD_API_KEY="bench",
+        TELEGRAM_GROUP_THRESHOLD=str(args.group_threshold),
+        IMAGE_PREFETCH="1" if args.prefetch_images else "0",
+        # Fixture articles differ only by their number, so they all look alike:
+        DUPLICATE_DETECTION="1" if args.duplicates else "0",
+    )
+
+
+def point_at_standins(source, standIns):
+    if source.name == "nvd_api":
+        source.news_url = f"{standIns.url}/nvd"
+        return
+    source.news_url = f"{standIns.url}/{source.name}/listing"
+    # The official site builds article urls from its module's BASE_URL:
+    module = sys.modules[type(source).__module__]
+    if hasattr(module, "BASE_URL"):
+        module.BASE_URL = standIns.url
+
+
+async def bench_source(name, standIns, verbose, memory):
+    from scripts.runner import load_source
+
+    source = load_source(name)
+    point_at_standins(source, standIns)
+    timer = StageTimer()
+    for stage in STAGES:
+        timer.wrap(source, stage)
+    os.environ["MONGO_URI"] = f"mongomock://{name}"
+
+    callsBefore = standIns.requests.get("send_calls", 0)
+    if memory:
+        tracemalloc.reset_peak()
+        memoryBefore = tracemalloc.get_traced_memory()[0]
+    output = io.StringIO()
+    startedAt = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stdout if verbose else output):
+        await source.run()
+    seconds = time.perf_counter() - startedAt
+    peak = tracemalloc.get_traced_memory()[1] - memoryBefore if memory else None
+
+    processed = standIns.cves if name == "nvd_api" else standIns.items
+    runReport = source.metrics.report()
+    return {
+        "source": name,
+        "seconds": seconds,
+        "processed": processed,
+        "delivered": runReport["counts"].get("sent", 0),
+        # Albums and digests deliver several items per call:
+        "telegram_calls": standIns.requests.get("send_calls", 0) - callsBefore,
+        "per_second": processed / seconds if seconds else 0.0,
+        "peak_memory_mb": peak / (1024 * 1024) if memory else None,
+        "stages": timer.report(),
+        "counts": runReport["counts"],
+        "skipped": runReport["skipped"],
+    }
+
+
+def print_result(result):
+    unit = "CVEs/s" if result["source"] == "nvd_api" else "articles/s"
+    memory = result["peak_memory_mb"]
+    print(
+        f"\n{result['source']}: {result['seconds']:.3f}s, "
+        f"{result['per_second']:.1f} {unit}, "
+        f"{result['delivered']}/{result['processed']} sent "
+        f"in {result['telegram_calls']} Telegram calls"
+        + (f", peak {memory:.1f} MB" if memory is not None else "")
+    )
+    for stage, stats in result["stages"].items():
+        print(
+            f"  {stage:<14} {stats['calls']:>5} calls  "
+            f"mean {stats['mean_ms']:8.2f}ms  p95 {stats['p95_ms']:8.2f}ms  "
+            f"total {stats['total_ms']:9.1f}ms"
+        )
+    if result["skipped"]:
+        skipped = ", ".join(f"{k}: {v}" for k, v in result["skipped"].items())
+        print(f"  skipped        {skipped}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Run sources end to end against local stand-ins"
+    )
+    parser.add_argument("sources", nargs="*", help=f"default: {', '.join(SOURCES)}")
+    parser.add_argument("--items", type=int, default=20, help="articles per listing")
+    parser.add_argument("--cves", type=int, default=200, help="CVEs in the NVD window")
+    parser.add_argument("--nvd-page-size", type=int, default=100)
+    parser.add_argument("--page-kb", type=int, default=100, help="filler per page")
+    parser.add_argument("--site-latency", type=float, default=0.0)
+    parser.add_argument("--telegram-latency", type=float, default=0.0)
+    parser.add_argument("--translation-latency", type=float, default=0.0)
+    parser.add_argument("--prefetch-images", action="store_true")
+    parser.add_argument(
+        "--group-threshold",
+        type=int,
+        default=5,
+        help="new items from which album/digest sources group their sends",
+    )
+    parser.add_argument(
+        "--duplicates", action="store_true", help="near-duplicate check"
+    )
+    parser.add_argument(
+        "--rate-limits",
+        action="store_true",
+        help="keep Telegram send intervals (off by default, they dominate)",
+    )
+    parser.add_argument(
+        "--no-memory",
+        action="store_true",
+        help="skip tracemalloc, it slows parsing down several times",
+    )
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--verbose", action="store_true", help="show source output")
+    args = parser.parse_args()
+    unknown = set(args.sources) - set(SOURCES)
+    if unknown:
+        parser.error(f"unknown sources: {', '.join(sorted(unknown))}")
+
+    standIns = StandIns(
+        items=args.items,
+        page_kb=args.page_kb,
+        cves=args.cves,
+        nvd_page_size=args.nvd_page_size,
+        telegram_latency=args.telegram_latency,
+        site_latency=args.site_latency,
+    )
+    with standIns, tempfile.TemporaryDirectory() as stateDir:
+        configure_env(standIns, stateDir, args)
+        from shared import telegram_service
+        from shared.event_loop import run_sync
+
+        if not args.rate_limits:
+            telegram_service.GLOBAL_SEND_INTERVAL = 0
+            telegram_service.GROUP_SEND_INTERVAL = 0
+            telegram_service.PRIVATE_SEND_INTERVAL = 0
+
+        memory = not args.no_memory
+        if memory:
+            tracemalloc.start()
+        results = []
+        for name in args.sources or SOURCES:
+            result = run_sync(bench_source(name, standIns, args.verbose, memory))
+            print_result(result)
+            results.append(result)
+        if memory:
+            tracemalloc.stop()
+
+        telegram_service.close_senders()
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as jsonFile:
+            json.dump(results, jsonFile, indent=2)
+
+
+if __name__ == "__main__":
+    main()
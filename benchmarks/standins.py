@@ -0,0 +1,224 @@
+import os
+import re
+import json
+import time
+import threading
+from string import Template
+from urllib.parse import parse_qs, urlsplit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+HTML_SOURCES = ("gate_ahram", "as", "marca", "official_news")
+
+# Jpeg markers around filler, only content type and size are ever checked:
+JPEG_BYTES = b"\xff\xd8\xff\xe0" + b"\x00" * 20 * 1024 + b"\xff\xd9"
+PADDING_BLOCK = (
+    '<div class="card"><a href="/related">Related story</a>'
+    "<p>Lorem ipsum dolor sit amet, consectetur adipiscing elit.</p></div>\n"
+)
+
+
+# Photos in a sendMediaGroup request, its media field is a json list:
+MEDIA_PHOTO = re.compile(rb'"type":\s*"photo"')
+
+
+def read_fixture(*parts):
+    with open(os.path.join(FIXTURES_DIR, *parts), encoding="utf-8") as fixture:
+        return fixture.read()
+
+
+class StandIns:
+    # One local server for every outside service a run talks to:
+    #   /<source>/listing, /<source>/article/<n>, /img/<n>.jpg  news sites
+    #   /nvd                                                   NVD CVE api 2.0
+    #   /bot<token>/<method>                                   Telegram Bot API
+    def __init__(
+        self,
+        items=20,
+        page_kb=100,
+        cves=200,
+        nvd_page_size=100,
+        telegram_latency=0.0,
+        site_latency=0.0,
+    ):
+        self.items = items
+        self.cves = cves
+        self.nvd_page_size = nvd_page_size
+        self.telegram_latency = telegram_latency
+        self.site_latency = site_latency
+        self.padding = PADDING_BLOCK * max(1, page_kb * 1024 // len(PADDING_BLOCK))
+        self.templates = {
+            name: {
+                part: Template(read_fixture(name, f"{part}.html"))
+                for part in ("listing", "item", "article")
+            }
+            for name in HTML_SOURCES
+        }
+        self.nvd_records = json.loads(read_fixture("nvd", "page.json"))[
+            "vulnerabilities"
+        ]
+        self.requests = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        standIns = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                standIns.handle(self)
+
+            def do_POST(self):
+                standIns.handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # -------- Routing --------
+    def handle(self, request):
+        length = int(request.headers.get("Content-Length") or 0)
+        body = request.rfile.read(length) if length else b""
+        parts = urlsplit(request.path)
+        path = parts.path.strip("/").split("/")
+        route = path[0]
+        with self._lock:
+            self.requests[route] = self.requests.get(route, 0) + 1
+
+        if route.startswith("bot"):
+            time.sleep(self.telegram_latency)
+            return self.reply(
+                request, 200, "application/json", self.telegram(path, body)
+            )
+        if route == "nvd":
+            query = {key: values[0] for key, values in parse_qs(parts.query).items()}
+            return self.reply(request, 200, "application/json", self.nvd_page(query))
+        time.sleep(self.site_latency)
+        if route == "img":
+            return self.reply(request, 200, "image/jpeg", JPEG_BYTES)
+        if route in self.templates and len(path) == 2 and path[1] == "listing":
+            return self.reply(
+                request, 200, "text/html; charset=utf-8", self.listing(route)
+            )
+        if route in self.templates and len(path) == 3 and path[1] == "article":
+            body = self.article(route, path[2])
+            return self.reply(request, 200, "text/html; charset=utf-8", body)
+        return self.reply(request, 404, "text/plain", "not found")
+
+    def reply(self, request, status, contentType, body):
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        request.send_response(status)
+        request.send_header("Content-Type", contentType)
+        request.send_header("Content-Length", str(len(body)))
+        request.end_headers()
+        request.wfile.write(body)
+
+    # -------- News sites --------
+    def item_url(self, source, n):
+        # The official site links relative to BASE_URL, the others absolute:
+        path = f"/{source}/article/{n}"
+        return path if source == "official_news" else f"{self.url}{path}"
+
+    def listing(self, source):
+        templates = self.templates[source]
+        items = "\n".join(
+            templates["item"].safe_substitute(
+                n=n, url=self.item_url(source, n), image=f"{self.url}/img/{n}.jpg"
+            )
+            for n in range(self.items)
+        )
+        return templates["listing"].safe_substitute(items=items, padding=self.padding)
+
+    def article(self, source, n):
+        return self.templates[source]["article"].safe_substitute(
+            n=n, image=f"{self.url}/img/{n}.jpg", padding=self.padding
+        )
+
+    # -------- NVD --------
+    def nvd_page(self, query):
+        startIndex = int(query.get("startIndex", 0))
+        perPage = min(int(query.get("resultsPerPage", 2000)), self.nvd_page_size)
+        vulnerabilities = []
+        for index in range(startIndex, min(startIndex + perPage, self.cves)):
+            record = json.loads(
+                json.dumps(self.nvd_records[index % len(self.nvd_records)])
+            )
+            record["cve"]["id"] = f"CVE-2026-{20000 + index}"
+            vulnerabilities.append(record)
+        return json.dumps(
+            {
+                "resultsPerPage": len(vulnerabilities),
+                "startIndex": startIndex,
+                "totalResults": self.cves,
+                "format": "NVD_CVE",
+                "version": "2.0",
+                "vulnerabilities": vulnerabilities,
+            }
+        )
+
+    # -------- Telegram --------
+    def telegram(self, path, body):
+        method = path[-1] if len(path) > 1 else ""
+        if method == "getMe":
+            result = {
+                "id": 1,
+                "is_bot": True,
+                "first_name": "bench",
+                "username": "bench_bot",
+            }
+            return json.dumps({"ok": True, "result": result})
+        with self._lock:
+            self.requests["send_calls"] = self.requests.get("send_calls", 0) + 1
+        if method == "sendMediaGroup":
+            result = [
+                self.message(photo=True)
+                for _ in range(max(1, len(MEDIA_PHOTO.findall(body))))
+            ]
+        else:
+            result = self.message(photo=method == "sendPhoto")
+        return json.dumps({"ok": True, "result": result})
+
+    def message(self, photo):
+        # "sent" counts messages in the chat, an album holds one per photo:
+        with self._lock:
+            messageId = self.requests.get("sent", 0) + 1
+            self.requests["sent"] = messageId
+        message = {
+            "message_id": messageId,
+            "date": int(time.time()),
+            "chat": {"id": -100, "type": "supergroup", "title": "bench"},
+        }
+        if photo:
+            message["photo"] = [
+                {
+                    "file_id": f"photo-{messageId}",
+                    "file_unique_id": f"unique-{messageId}",
+                    "width": 1,
+                    "height": 1,
+                }
+            ]
+        return message
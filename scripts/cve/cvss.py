@@ -0,0 +1,107 @@
+from functools import lru_cache
+
+UNKNOWN = "Unknown"
+
+# Shared value tables:
+_ATTACK_VECTOR = {"N": "NETWORK", "A": "ADJACENT", "L": "LOCAL", "P": "PHYSICAL"}
+_LOW_HIGH = {"L": "LOW", "H": "HIGH"}
+_NONE_LOW_HIGH = {"N": "NONE", "L": "LOW", "H": "HIGH"}
+
+# Vector metric -> (result field, value labels), per CVSS version:
+_V2 = {
+    "AV": ("attack_vector", {"N": "NETWORK", "A": "ADJACENT_NETWORK", "L": "LOCAL"}),
+    "AC": ("complexity", {"L": "LOW", "M": "MEDIUM", "H": "HIGH"}),
+    "Au": ("auth_required", {"N": "NONE", "S": "SINGLE", "M": "MULTIPLE"}),
+    "E": (
+        "exploit_state",
+        {
+            "ND": "NOT_DEFINED",
+            "U": "UNPROVEN",
+            "POC": "PROOF_OF_CONCEPT",
+            "F": "FUNCTIONAL",
+            "H": "HIGH",
+        },
+    ),
+    "C": ("confidentiality", {"N": "NONE", "P": "PARTIAL", "C": "COMPLETE"}),
+    "I": ("integrity", {"N": "NONE", "P": "PARTIAL", "C": "COMPLETE"}),
+    "A": ("availability", {"N": "NONE", "P": "PARTIAL", "C": "COMPLETE"}),
+}
+_V3 = {
+    "AV": ("attack_vector", _ATTACK_VECTOR),
+    "AC": ("complexity", _LOW_HIGH),
+    "PR": ("auth_required", _NONE_LOW_HIGH),
+    "E": (
+        "exploit_state",
+        {
+            "X": "NOT_DEFINED",
+            "U": "UNPROVEN",
+            "P": "PROOF_OF_CONCEPT",
+            "F": "FUNCTIONAL",
+            "H": "HIGH",
+        },
+    ),
+    "C": ("confidentiality", _NONE_LOW_HIGH),
+    "I": ("integrity", _NONE_LOW_HIGH),
+    "A": ("availability", _NONE_LOW_HIGH),
+}
+_V4 = {
+    "AV": ("attack_vector", _ATTACK_VECTOR),
+    "AC": ("complexity", _LOW_HIGH),
+    "PR": ("auth_required", _NONE_LOW_HIGH),
+    "E": (
+        "exploit_state",
+        {"X": "NOT_DEFINED", "U": "UNPROVEN", "P": "PROOF_OF_CONCEPT", "A": "ATTACKED"},
+    ),
+    "VC": ("confidentiality", _NONE_LOW_HIGH),
+    "VI": ("integrity", _NONE_LOW_HIGH),
+    "VA": ("availability", _NONE_LOW_HIGH),
+}
+TABLES = {"2.0": _V2, "3.0": _V3, "3.1": _V3, "4.0": _V4}
+
+
+class CvssVector:
+    __slots__ = (
+        "version",
+        "attack_vector",
+        "complexity",
+        "auth_required",
+        "exploit_state",
+        "confidentiality",
+        "integrity",
+        "availability",
+    )
+
+    def __init__(self, version):
+        self.version = version
+        self.attack_vector = UNKNOWN
+        self.complexity = UNKNOWN
+        self.auth_required = UNKNOWN
+        self.exploit_state = UNKNOWN
+        self.confidentiality = UNKNOWN
+        self.integrity = UNKNOWN
+        self.availability = UNKNOWN
+
+    def __repr__(self):
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"CvssVector({fields})"
+
+
+@lru_cache(maxsize=4096)
+def parse_vector(vector_string):
+    # Vectors repeat heavily, so each distinct one is parsed once per process.
+    # Treat the result as read only, it is shared between callers:
+    parts = (vector_string or "").split("/")
+    version = "2.0"
+    if parts[0].startswith("CVSS:"):
+        version = parts.pop(0)[5:]
+    result = CvssVector(version)
+
+    table = TABLES.get(version)
+    if table is None:
+        return result
+    for part in parts:
+        metric, _, value = part.partition(":")
+        entry = table.get(metric)
+        if entry:
+            setattr(result, entry[0], entry[1].get(value, UNKNOWN))
+    return result
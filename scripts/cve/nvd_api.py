@@ -1,194 +1,236 @@
 import os
 import re
-import asyncio
-import requests
-from datetime import datetime
-from shared.database_service import cve_exists, get_collection, save_cve
-from shared.telegram_service import send_text_message
+import html
+import argparse
+from datetime import datetime, timedelta, timezone
 from dotenv import load_dotenv
+
+load_dotenv()
+
+from shared import metrics
+from shared.source import MINUTE, Source, run_source
 from scripts.cve.nvd_api_config import (
     API_URL,
     HEADERS,
     COLLECTION_NAME,
+    SOURCE_NAME,
 )
-
-load_dotenv()
-
-# Secret Keys:
-TELEGRAM_TOKEN_CVE = os.getenv("TELEGRAM_TOKEN_CVE")
-TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
-MONGO_URI = os.getenv("MONGO_URI")
-NVD_API_KEY = os.getenv("NVD_API_KEY")
-if not all([TELEGRAM_TOKEN_CVE, TELEGRAM_CHAT_ID, MONGO_URI, NVD_API_KEY]):
-    raise Exception("Missing environment variables")
-
-
-# Generate Report:
-def generate_report(vector_string):
-    mapping = {
-        "AV": {
-            "N": "NETWORK",
-            "A": "ADJACENT",
-            "L": "LOCAL",
-            "P": "PHYSICAL",
-        },
-        "PR": {
-            "N": "NONE",
-            "L": "LOW",
-            "H": "HIGH",
-        },
-        "AC": {"L": "LOW", "H": "HIGH"},
-        "E": {
-            "X": "NOT_DEFINED",
-            "U": "UNPROVEN",
-            "P": "PROOF_OF_CONCEPT",
-            "A": "ATTACKED",
-        },
-        "VC": {"H": "HIGH", "L": "LOW", "N": "NONE"},
-        "VI": {"H": "HIGH", "L": "LOW", "N": "NONE"},
-        "VA": {"H": "HIGH", "L": "LOW", "N": "NONE"},
-    }
-
-    parts = {
-        p.split(":")[0]: p.split(":")[1] for p in vector_string.split("/") if ":" in p
-    }
-
-    report = {
-        "authRequired": mapping["PR"].get(parts.get("PR"), "Unknown"),
-        "attackVector": mapping["AV"].get(parts.get("AV"), "Unknown"),
-        "complexity": mapping["AC"].get(parts.get("AC"), "Unknown"),
-        "exploitState": mapping["E"].get(parts.get("E"), "Unknown"),
-        "confidentiality": mapping["VC"].get(parts.get("VC"), "Unknown"),
-        "integrity": mapping["VI"].get(parts.get("VI"), "Unknown"),
-        "availability": mapping["VA"].get(parts.get("VA"), "Unknown"),
-    }
-
-    return report
-
-
-print("nvd_api Script Running:\n")
-
-try:
-    # Constants:
-    now = datetime.now()
-    startTimeParam = now.strftime("%Y-%m-%dT00:00:00.000")
-    endTimeParam = now.strftime("%Y-%m-%dT23:59:59.999")
-
-    api = API_URL
-    headers = {"apiKey": NVD_API_KEY, **HEADERS}
-    params = {
-        "pubStartDate": startTimeParam,
-        "pubEndDate": endTimeParam,
-    }
-    apiResponse = requests.get(api, headers=headers, params=params)
-    responseCode = apiResponse.status_code
-    if responseCode == 200:
-
-        print("Getting CVE ids from database...")
-        cveIdsCollection = get_collection(
-            uri=MONGO_URI, collection_name=COLLECTION_NAME, db_name="my_db"
+from scripts.cve.nvd_client import NvdApiError, NvdClient, format_date, parse_date
+from scripts.cve.nvd_mirror import NvdMirror
+from scripts.cve.triage import triage_item
+from scripts.cve.cvss import parse_vector
+
+FIRST_RUN_WINDOW = timedelta(days=1)
+# NVD can index a CVE a little after its published time:
+WINDOW_OVERLAP = timedelta(minutes=15)
+# Also pick up CVEs re-scored since the last run:
+TRACK_MODIFIED = os.getenv("NVD_TRACK_MODIFIED", "").lower() in ("1", "true", "yes")
+# Keep every fetched record in the local mirror, replays always use it:
+USE_MIRROR = os.getenv("NVD_MIRROR", "").lower() in ("1", "true", "yes")
+
+
+class NvdSource(Source):
+    name = "nvd_api"
+    interval = 30 * MINUTE
+    news_url = API_URL
+    headers = HEADERS
+    collection_name = COLLECTION_NAME
+    source_name = SOURCE_NAME
+    key_field = "cve_id"
+    token_env = "TELEGRAM_TOKEN_CVE"
+    extra_env = ("NVD_API_KEY",)
+    message_kind = "text"
+
+    def __init__(self, replay=None, offline=False):
+        # replay is a (since, until) published window, run without touching state:
+        super().__init__()
+        self.replay = replay
+        self.offline = offline
+        self.mirror = NvdMirror() if USE_MIRROR or replay or offline else None
+
+    async def restore_state(self):
+        return {} if self.replay else await super().restore_state()
+
+    async def store_state(self, state):
+        if not self.replay:
+            await super().store_state(state)
+
+    def windows(self, state, until):
+        # (field, since) for each window of this run:
+        if self.replay:
+            return [("pub", self.replay[0])]
+        fields = [("pub", "published_until")]
+        if TRACK_MODIFIED:
+            fields.append(("lastMod", "modified_until"))
+        return [
+            (
+                field,
+                (
+                    parse_date(state[stateKey]) - WINDOW_OVERLAP
+                    if state.get(stateKey)
+                    else until - FIRST_RUN_WINDOW
+                ),
+            )
+            for field, stateKey in fields
+        ]
+
+    async def fetch_listing(self, fetcher, state):
+        # Only the delta since the last clean run, in UTC, across every page:
+        client = NvdClient(
+            fetcher,
+            self.news_url,
+            api_key=self.env["NVD_API_KEY"],
+            headers=self.headers,
+            mirror=self.mirror,
+            offline=self.offline,
+        )
+        until = self.replay[1] if self.replay else datetime.now(timezone.utc)
+
+        # Triaged as the records stream in, only survivors are kept:
+        items = {}
+        dropped = {}
+        cveIds = set()
+        unnamed = 0
+        try:
+            for field, since in self.windows(state, until):
+                print(f"Request {field} CVEs since {format_date(since)}")
+                async for vulneItem in client.iter_vulnerabilities(since, until, field):
+                    cveId, payload, reason = triage_item(vulneItem)
+                    if cveId:
+                        cveIds.add(cveId)
+                    else:
+                        unnamed += 1
+                    if payload:
+                        items[cveId] = payload
+                        continue
+                    # A later record of the same CVE replaces the earlier one:
+                    items.pop(cveId, None)
+                    dropped[reason] = dropped.get(reason, 0) + 1
+        except (NvdApiError, ValueError) as e:
+            print(e)
+            return None
+        return {
+            "count": len(cveIds) + unnamed,
+            "items": list(items.items()),
+            "dropped": dropped,
+            "until": format_date(until),
+        }
+
+    def listing_state(self, listing, items):
+        state = {
+            "published_until": listing["until"],
+            "items_hash": self.items_hash(items),
+        }
+        if TRACK_MODIFIED:
+            state["modified_until"] = listing["until"]
+        return state
+
+    def state_after_failures(self, state, newState, failed):
+        # Each mark stops at the oldest CVE worth another try. One Telegram
+        # rejected or that faild to build fails again, it never holds them back:
+        from telegram.error import BadRequest
+
+        retried = [
+            payload["cve"]
+            for _, payload, error in failed
+            if error is not None and not isinstance(error, BadRequest)
+        ]
+        newState = {**newState, "items_hash": None}
+        for stateKey, field in (
+            ("published_until", "published"),
+            ("modified_until", "lastModified"),
+        ):
+            dates = [parse_date(cve[field]) for cve in retried if cve.get(field)]
+            if stateKey not in newState or not dates:
+                continue
+            # Never behind the last mark, other windows may hold older CVEs:
+            mark = min([parse_date(newState[stateKey]), *dates])
+            if state.get(stateKey):
+                mark = max(mark, parse_date(state[stateKey]))
+            newState[stateKey] = format_date(mark)
+        return newState
+
+    def get_items(self, listing):
+        # Triaged while fetching, only survivors reach the database:
+        items = listing["items"]
+        print(f"CVEs Count: {listing['count']}")
+        for reason, count in listing["dropped"].items():
+            print(f"{count} CVEs dropped, {reason} - Skipping")
+            metrics.skip(reason, count)
+        print(f"{len(items)} CVEs left after triage\n")
+        return items
+
+    async def load_item(self, fetcher, cveId, payload):
+        return payload
+
+    def build_message(self, cveId, payload):
+        cve = payload["cve"]
+        baseScore = payload["score"]
+        descriptions = cve["descriptions"]
+        weaknesses = cve["weaknesses"]
+        references = cve["references"]
+        print(f" - CVSS {payload['version']} Base Score is: {baseScore}")
+
+        description = descriptions[0].get("value")
+        clean_description = re.sub(r"\n{3,}", "\n\n", description).strip()
+        descriptionLen = len(clean_description)
+        print(f" - Description is: {clean_description[:20]}...")
+
+        weaknesse = weaknesses[0].get("description")[0].get("value")
+        print(f" - Weaknesse is: {weaknesse}")
+
+        referenceUrl = references[0].get("url")
+        referenceSouce = references[0].get("source")
+        print(f" - Reference Url is: {referenceUrl}")
+        print(f" - Reference Souce is: {referenceSouce}")
+
+        publishedDate = datetime.strptime(cve.get("published"), "%Y-%m-%dT%H:%M:%S.%f")
+        messageTitle = "CRITICAL" if payload["severity"] == "CRITICAL" else "HIGH ALERT"
+        vector = parse_vector(payload["vector"])
+
+        # NVD text is plain, a "<" in it would make Telegram reject the message:
+        message = (
+            f"<b>{messageTitle} - <code>{html.escape(cveId)}</code>  - "
+            f"<code>{html.escape(weaknesse)}</code></b>\n\n"
+            f"<b>{html.escape(clean_description[:2000])}"
+            f"{'...' if descriptionLen > 2000 else ''}</b>\n\n"
+            f"CVSS Details:\n"
+            f"- <b>Auth Required:</b> {vector.auth_required}\n"
+            f"- <b>Attack Vector:</b> {vector.attack_vector}\n"
+            f"- <b>Complexity:</b> {vector.complexity}\n"
+            f"- <b>Exploit State:</b> {vector.exploit_state}\n"
+            f"- <b>Confidentiality:</b> {vector.confidentiality}\n"
+            f"- <b>Integrity:</b> {vector.integrity}\n"
+            f"- <b>Availability:</b> {vector.availability}\n"
+            f"- <b>Base Score:</b> {baseScore}\n\n"
+            f"Published at: {publishedDate.strftime('%I:%M %p, %A, %d-%m-%Y')}"
         )
-        print(f"Get CVE ids from database successfully\n")
-
-        print(f"Request Success - CODE IS: {responseCode}\n")
-        apiResponseJson = apiResponse.json()
-        vulnerabilitiesList = apiResponseJson.get("vulnerabilities")
-        print(f"CVEs Count: {len(vulnerabilitiesList)}\n")
-
-        if vulnerabilitiesList:
-            for vulneItem in vulnerabilitiesList:
-                cve = vulneItem.get("cve", {})
-
-                cveId = cve.get("id", None)
-                if not cveId:
-                    print(f"CVE id not avaliable - Skipping\n")
-                    continue
-
-                isInDatabase = cve_exists(collection=cveIdsCollection, cveId=cveId)
-                if isInDatabase:
-                    print(f"- {cveId} in database - Skipping\n")
-                    continue
-
-                print(f"- {cveId} Not in database - Working...")
-                isMetricsDict = cve.get("metrics")
-                if not isMetricsDict:
-                    print("No metrics avaliable! - Skiping\n")
-                    continue
-
-                metricsDict = cve.get("metrics")[list(cve.get("metrics"))[0]]
-                cvssDataDict = metricsDict[0].get("cvssData")
-                baseScore = cvssDataDict.get("baseScore")
-                if baseScore < 7:
-                    print("Base Score Under 7 - Canceling\n")
-                    continue
-
-                descriptions = cve.get("descriptions", None)
-                weaknesses = cve.get("weaknesses", None)
-                references = cve.get("references", None)
-
-                if not all([descriptions, weaknesses, references]):
-                    print("Some data missing! - Skipping\n")
-                    continue
-
-                description = descriptions[0].get("value")
-                clean_description = re.sub(r"\n{3,}", "\n\n", description).strip()
-                descriptionLen = len(clean_description)
-                print(f" - Description is: {clean_description[:20]}...")
-
-                weaknesse = cve.get("weaknesses")[0].get("description")[0].get("value")
-                print(f" - Weaknesse is: {weaknesse}")
-
-                referenceUrl = cve.get("references")[0].get("url")
-                referenceSouce = cve.get("references")[0].get("source")
-                print(f" - Reference Url is: {referenceUrl}")
-                print(f" - Reference Souce is: {referenceSouce}")
-
-                publishedDate = datetime.strptime(
-                    cve.get("published"), "%Y-%m-%dT%H:%M:%S.%f"
-                )
-                messageTitle = "CRITICAL" if baseScore >= 9 else "HIGH" " ALERT"
-                reportDict = generate_report(cvssDataDict.get("vectorString"))
-                authRequired = reportDict.get("authRequired", "UNKNOWN")
-                attackVector = reportDict.get("attackVector", "UNKNOWN")
-                complexity = reportDict.get("complexity", "UNKNOWN")
-                exploitState = reportDict.get("exploitState", "UNKNOWN")
-                confidentiality = reportDict.get("confidentiality", "UNKNOWN")
-                integrity = reportDict.get("integrity", "UNKNOWN")
-                availability = reportDict.get("availability", "UNKNOWN")
-
-                message = (
-                    f"<b>{messageTitle} - <code>{cveId}</code>  - <code>{weaknesse}</code></b>\n\n"
-                    f"<b>{clean_description[:2000]}{'...' if descriptionLen > 2000 else ''}</b>\n\n"
-                    f"CVSS Details:\n"
-                    f"- <b>Auth Required:</b> {authRequired}\n"
-                    f"- <b>Attack Vector:</b> {attackVector}\n"
-                    f"- <b>Complexity:</b> {complexity}\n"
-                    f"- <b>Exploit State:</b> {exploitState}\n"
-                    f"- <b>Confidentiality:</b> {confidentiality}\n"
-                    f"- <b>Integrity:</b> {integrity}\n"
-                    f"- <b>Availability:</b> {availability}\n"
-                    f"- <b>Base Score:</b> {baseScore}\n\n"
-                    f"Published at: {publishedDate.strftime('%I:%M %p, %A, %d-%m-%Y')}"
-                )
-
-                # Send to telegram:
-                print("Send message to telegram - Sending")
-                asyncio.run(
-                    send_text_message(
-                        token=TELEGRAM_TOKEN_CVE,
-                        chat_id=TELEGRAM_CHAT_ID,
-                        text=message,
-                        source_url=f"https://www.cvedetails.com/cve/{cveId}",
-                    )
-                )
-                print("Message sended to telegram successfully")
-
-                print("Save CVE to database:")
-                save_cve(collection=cveIdsCollection, cve_data={"cve_id": cveId})
-                print("CVE saved to database successfully - Continue \n")
-
-            print("✅ All Done - Exsitting")
-    else:
-        print(f"Faild to get data from api! - CODE IS: {responseCode}")
-except Exception as e:
-    print(e)
+        return {"text": message}
+
+    def source_url(self, cveId):
+        return f"https://www.cvedetails.com/cve/{cveId}"
+
+    def claim_document(self, cveId):
+        return {"cve_id": cveId}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Post new high severity CVEs")
+    parser.add_argument(
+        "--replay",
+        nargs=2,
+        metavar=("SINCE", "UNTIL"),
+        type=parse_date,
+        help="rerun the pipeline over a past published window (ISO dates, UTC)",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="read only from the local mirror, never call the NVD api",
+    )
+    args = parser.parse_args()
+    run_source(NvdSource(replay=args.replay, offline=args.offline))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from shared import metrics
+from shared.json_stream import JsonArrayStream
+
+RESULTS_PER_PAGE = 2000
+API_TIMEOUT = 60
+
+# NVD accepts date ranges of at most 120 days:
+MAX_WINDOW = timedelta(days=120)
+
+# Requests per rolling 30 seconds, with and without an api key:
+KEYED_RATE_LIMIT = 50
+PUBLIC_RATE_LIMIT = 5
+RATE_WINDOW = 30
+
+# Records written to the mirror per sqlite transaction:
+MIRROR_BATCH = 200
+
+# The only cve fields the filter and message read, the rest is dropped while streaming:
+CVE_FIELDS = (
+    "id",
+    "published",
+    "lastModified",
+    "metrics",
+    "descriptions",
+    "weaknesses",
+    "references",
+)
+
+
+def format_date(moment):
+    moment = moment.astimezone(timezone.utc)
+    return f"{moment:%Y-%m-%dT%H:%M:%S}.{moment.microsecond // 1000:03d}+00:00"
+
+
+def parse_date(value):
+    moment = datetime.fromisoformat(value)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment
+
+
+def project_vulnerability(vulneItem):
+    cve = vulneItem.get("cve") or {}
+    return {"cve": {field: cve[field] for field in CVE_FIELDS if field in cve}}
+
+
+def split_window(start, end):
+    windows = []
+    while start < end:
+        windowEnd = min(start + MAX_WINDOW, end)
+        windows.append((start, windowEnd))
+        start = windowEnd
+    return windows
+
+
+class RateLimiter:
+    # At most `limit` requests in any rolling `window` seconds:
+    def __init__(self, limit, window=RATE_WINDOW):
+        self.limit = limit
+        self.window = window
+        self._sentAt = deque()
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            while len(self._sentAt) >= self.limit:
+                delay = self._sentAt[0] + self.window - loop.time()
+                if delay <= 0:
+                    self._sentAt.popleft()
+                    continue
+                await asyncio.sleep(delay)
+            self._sentAt.append(loop.time())
+
+
+_limiters = {}
+
+
+def get_limiter(keyed):
+    limiter = _limiters.get(keyed)
+    if limiter is None:
+        limiter = RateLimiter(KEYED_RATE_LIMIT if keyed else PUBLIC_RATE_LIMIT)
+        _limiters[keyed] = limiter
+    return limiter
+
+
+class NvdApiError(Exception):
+    pass
+
+
+class NvdClient:
+    def __init__(
+        self,
+        fetcher,
+        api_url,
+        api_key=None,
+        headers=None,
+        results_per_page=RESULTS_PER_PAGE,
+        mirror=None,
+        offline=False,
+    ):
+        self.fetcher = fetcher
+        self.api_url = api_url
+        self.headers = {**(headers or {})}
+        if api_key:
+            self.headers["apiKey"] = api_key
+        self.results_per_page = results_per_page
+        self.limiter = get_limiter(bool(api_key))
+        # Mirror is read first and filled on a miss, offline never calls the api:
+        self.mirror = mirror
+        self.offline = offline
+
+    @asynccontextmanager
+    async def open_page(self, params, start_index):
+        # A stream over one page, its vulnerabilities are read as they arrive:
+        with metrics.stage("nvd_rate_limit"):
+            await self.limiter.wait()
+        metrics.count("nvd_pages")
+        async with self.fetcher.stream_async(
+            self.api_url,
+            headers=self.headers,
+            params={
+                **params,
+                "startIndex": start_index,
+                "resultsPerPage": self.results_per_page,
+            },
+            timeout=API_TIMEOUT,
+        ) as response:
+            if response.status_code != 200:
+                raise NvdApiError(
+                    f"Faild to get data from api! - CODE IS: {response.status_code}"
+                )
+            yield JsonArrayStream(response.aiter_bytes(), "vulnerabilities")
+
+    async def iter_results(self, params):
+        # Follows startIndex until totalResults is reached:
+        startIndex = 0
+        while True:
+            count = 0
+            async with self.open_page(params, startIndex) as stream:
+                totalResults = (await stream.read_header()).get("totalResults", 0)
+                async for vulneItem in stream.items():
+                    count += 1
+                    yield vulneItem
+            startIndex += count
+            if not count or startIndex >= totalResults:
+                return
+
+    async def iter_window(self, field, start, end):
+        # Raw records of one window, from the mirror when it was fetched before:
+        startDate, endDate = format_date(start), format_date(end)
+        if self.mirror and await asyncio.to_thread(
+            self.mirror.covers, field, startDate, endDate
+        ):
+            metrics.count("nvd_mirror_windows")
+            offset = 0
+            while True:
+                page = await asyncio.to_thread(
+                    self.mirror.read, field, startDate, endDate, offset, MIRROR_BATCH
+                )
+                for vulneItem in page:
+                    yield vulneItem
+                if len(page) < MIRROR_BATCH:
+                    return
+                offset += len(page)
+        if self.offline:
+            raise NvdApiError(f"Window {startDate} - {endDate} not in the mirror")
+
+        params = {f"{field}StartDate": startDate, f"{field}EndDate": endDate}
+        batch = []
+        async for vulneItem in self.iter_results(params):
+            if self.mirror:
+                batch.append(vulneItem)
+                if len(batch) >= MIRROR_BATCH:
+                    await asyncio.to_thread(self.mirror.store, batch)
+                    batch = []
+            yield vulneItem
+        if self.mirror:
+            await asyncio.to_thread(self.mirror.store, batch)
+            await asyncio.to_thread(self.mirror.mark_covered, field, startDate, endDate)
+
+    async def iter_vulnerabilities(self, start, end, field="pub"):
+        # field is "pub" for published dates or "lastMod" for last modified dates:
+        for windowStart, windowEnd in split_window(start, end):
+            async for vulneItem in self.iter_window(field, windowStart, windowEnd):
+                yield project_vulnerability(vulneItem)
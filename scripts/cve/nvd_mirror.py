@@ -0,0 +1,122 @@
+import os
+import json
+import zlib
+import sqlite3
+import threading
+from shared.state_store import STATE_DIR
+
+MIRROR_PATH = os.getenv("NVD_MIRROR_PATH", os.path.join(STATE_DIR, "nvd_mirror.sqlite"))
+# Date columns per NVD window field:
+DATE_COLUMNS = {"pub": "published", "lastMod": "last_modified"}
+
+
+def _index_date(value):
+    # NVD dates without offset, the same text format format_date writes:
+    return (value or "")[:23]
+
+
+class NvdMirror:
+    # Raw NVD records, zlib compressed, indexed by cve id and both dates,
+    # plus the windows that were fetched completely:
+    def __init__(self, path=MIRROR_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _get_db(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.executescript(
+                "CREATE TABLE IF NOT EXISTS records "
+                "(cve_id TEXT PRIMARY KEY, published TEXT, last_modified TEXT, data BLOB);"
+                "CREATE INDEX IF NOT EXISTS records_published ON records (published);"
+                "CREATE INDEX IF NOT EXISTS records_last_modified "
+                "ON records (last_modified);"
+                "CREATE TABLE IF NOT EXISTS windows "
+                "(field TEXT, start TEXT, end TEXT, PRIMARY KEY (field, start, end));"
+            )
+        return self._db
+
+    def store(self, vulnerabilities):
+        rows = []
+        for vulneItem in vulnerabilities:
+            cve = vulneItem.get("cve") or {}
+            if not cve.get("id"):
+                continue
+            data = zlib.compress(json.dumps(vulneItem, separators=(",", ":")).encode())
+            rows.append(
+                (
+                    cve["id"],
+                    _index_date(cve.get("published")),
+                    _index_date(cve.get("lastModified")),
+                    data,
+                )
+            )
+        with self._lock:
+            db = self._get_db()
+            with db:
+                db.executemany(
+                    "INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?)", rows
+                )
+
+    def mark_covered(self, field, start, end):
+        with self._lock:
+            db = self._get_db()
+            with db:
+                db.execute(
+                    "INSERT OR IGNORE INTO windows VALUES (?, ?, ?)",
+                    (field, _index_date(start), _index_date(end)),
+                )
+
+    def covers(self, field, start, end):
+        # True when fetched windows together span start..end:
+        start, end = _index_date(start), _index_date(end)
+        with self._lock:
+            windows = (
+                self._get_db()
+                .execute(
+                    "SELECT start, end FROM windows WHERE field = ? "
+                    "AND start <= ? AND end >= ? ORDER BY start",
+                    (field, end, start),
+                )
+                .fetchall()
+            )
+        coveredUntil = start
+        for windowStart, windowEnd in windows:
+            if windowStart > coveredUntil:
+                return False
+            coveredUntil = max(coveredUntil, windowEnd)
+            if coveredUntil >= end:
+                return True
+        return False
+
+    def read(self, field, start, end, offset=0, limit=500):
+        # One page of a window's records in date order:
+        column = DATE_COLUMNS[field]
+        with self._lock:
+            rows = (
+                self._get_db()
+                .execute(
+                    f"SELECT data FROM records WHERE {column} >= ? AND {column} <= ? "
+                    f"ORDER BY {column}, cve_id LIMIT ? OFFSET ?",
+                    (_index_date(start), _index_date(end), limit, offset),
+                )
+                .fetchall()
+            )
+        return [json.loads(zlib.decompress(data)) for (data,) in rows]
+
+    def get(self, cve_id):
+        with self._lock:
+            row = (
+                self._get_db()
+                .execute("SELECT data FROM records WHERE cve_id = ?", (cve_id,))
+                .fetchone()
+            )
+        return json.loads(zlib.decompress(row[0])) if row else None
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,72 @@
+import os
+
+# Newest CVSS version first, the first one present on a CVE is used:
+METRIC_PREFERENCE = (
+    ("cvssMetricV40", "4.0"),
+    ("cvssMetricV31", "3.1"),
+    ("cvssMetricV30", "3.0"),
+    ("cvssMetricV2", "2.0"),
+)
+
+# Thresholds, CVEs scoring under MIN_SCORE are never looked up or posted:
+MIN_SCORE = float(os.getenv("NVD_MIN_SCORE", "7"))
+CRITICAL_SCORE = float(os.getenv("NVD_CRITICAL_SCORE", "9"))
+
+
+def select_metric(metrics):
+    # (version, metric) of the preferred CVSS version, NVD's own score first:
+    for metricKey, version in METRIC_PREFERENCE:
+        entries = metrics.get(metricKey) or []
+        entries = [entry for entry in entries if entry.get("cvssData")]
+        if not entries:
+            continue
+        primary = [entry for entry in entries if entry.get("type") == "Primary"]
+        return version, (primary or entries)[0]
+    return None, None
+
+
+def has_message_data(cve):
+    # First description, weakness and reference, build_message reads these:
+    descriptions = cve.get("descriptions") or [{}]
+    weaknesses = cve.get("weaknesses") or [{}]
+    weakness = weaknesses[0].get("description") or [{}]
+    references = cve.get("references") or [{}]
+    return bool(
+        descriptions[0].get("value")
+        and weakness[0].get("value")
+        and references[0].get("url")
+        and cve.get("published")
+    )
+
+
+def triage_cve(cve, min_score=MIN_SCORE):
+    # Triage payload of a CVE worth posting, or the reason it was dropped:
+    version, metric = select_metric(cve.get("metrics") or {})
+    if metric is None:
+        return None, "no metrics"
+
+    cvssData = metric["cvssData"]
+    baseScore = cvssData.get("baseScore")
+    if baseScore is None or baseScore < min_score:
+        return None, f"score under {min_score:g}"
+
+    if not has_message_data(cve):
+        return None, "missing data"
+
+    return {
+        "cve": cve,
+        "version": version,
+        "score": baseScore,
+        "vector": cvssData.get("vectorString", ""),
+        "severity": "CRITICAL" if baseScore >= CRITICAL_SCORE else "HIGH",
+    }, None
+
+
+def triage_item(vulneItem, min_score=MIN_SCORE):
+    # (cveId, payload, reason) of one listing record, as it streams in:
+    cve = vulneItem.get("cve") or {}
+    cveId = cve.get("id")
+    if not cveId:
+        return None, None, "no id"
+    payload, reason = triage_cve(cve, min_score)
+    return cveId, payload, reason
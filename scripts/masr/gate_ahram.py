@@ -1,11 +1,11 @@
-import os
 import re
-import asyncio
-import requests
-from bs4 import BeautifulSoup
-from shared.database_service import get_collection, save_url, url_exists
-from shared.telegram_service import send_photo_message
 from dotenv import load_dotenv
+
+load_dotenv()
+
+from bs4 import SoupStrainer
+from shared.html_parser import image_src
+from shared.source import Source, run_source
 from scripts.masr.configs.gate_ahram_config import (
     NEWS_URL,
     HEADERS,
@@ -13,96 +13,54 @@ from scripts.masr.configs.gate_ahram_config import (
     SOURCE_NAME,
 )
 
-load_dotenv()
+LINK_ITEM_ID = re.compile(r"^ContentPlaceHolder1_dlNewsContentUrgent_divOuterNews_\d+$")
+ARTICLE_PART_ID = re.compile(r"^ContentPlaceHolder1_div(Title|MainImage|Content)$")
 
-# Secret Keys:
-TELEGRAM_TOKEN_MASR_NEWS = os.getenv("TELEGRAM_TOKEN_MASR_NEWS")
-TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
-MONGO_URI = os.getenv("MONGO_URI")
-if not all([TELEGRAM_TOKEN_MASR_NEWS, TELEGRAM_CHAT_ID, MONGO_URI]):
-    raise Exception("Missing environment variables")
 
+class GateAhramSource(Source):
+    name = "gate_ahram"
+    news_url = NEWS_URL
+    headers = HEADERS
+    collection_name = COLLECTION_NAME
+    source_name = SOURCE_NAME
+    token_env = "TELEGRAM_TOKEN_MASR_NEWS"
+    listing_strainer = SoupStrainer("div", id=LINK_ITEM_ID)
+    article_strainer = SoupStrainer(id=ARTICLE_PART_ID)
 
-def getUrlData(url):
-    try:
-        response = requests.get(url, timeout=10)
-        if response.status_code != 200:
-            return None
+    def extract_links(self, soup):
+        linkItems = soup.find_all("div", id=LINK_ITEM_ID)
+        linkItems.reverse()
+        urls = []
+        for linkItem in linkItems:
+            aTag = linkItem.find("a", href=True)
+            if aTag:
+                urls.append(aTag.get("href"))
+        return urls
 
-        soup = BeautifulSoup(response.text, "html.parser")
+    def parse_article(self, soup):
         title = soup.find("h1", id="ContentPlaceHolder1_divTitle").get_text()
         imageContainer = soup.find("div", id="ContentPlaceHolder1_divMainImage")
-        imageUrl = imageContainer.find("img", src=True).get("src")
+        imageUrl = image_src(imageContainer.find("img"))
         pTagsContainer = soup.find("div", id="ContentPlaceHolder1_divContent")
         pTags = pTagsContainer.find_all("p")
         desc = f""
         for p in pTags:
             desc += f"\n{p.get_text()}\n"
-        cleanDesc = f"{desc[:1000]}..." if len(desc) > 1000 else desc
-
-        caption = f"<b>{title}</b>\n" f"{cleanDesc}\n\n" f"المصدر: <b>{SOURCE_NAME}</b>"
-        return caption, imageUrl
-    except Exception:
-        return None
-
+        return {"title": title, "description": desc, "image": imageUrl}
 
-print("gate_ahram Script is Running...")
-
-response = requests.get(
-    url=NEWS_URL,
-    headers=HEADERS,
-    timeout=10,
-)
-
-if response.status_code == 200:
-    soup = BeautifulSoup(response.text, "html.parser")
-    linkItems = soup.find_all(
-        "div",
-        id=re.compile(r"^ContentPlaceHolder1_dlNewsContentUrgent_divOuterNews_\d+$"),
-    )
-
-    urls = []
-    if linkItems:
-        linkItems.reverse()
-        for linkItem in linkItems:
-            urls.append(linkItem.find("a", href=True).get("href"))
-
-    if urls:
-        print("Getting articles from database...")
-        masrArticlesNews = get_collection(
-            uri=MONGO_URI, collection_name=COLLECTION_NAME, db_name="my_db"
+    def render_caption(self, article):
+        desc = article["description"]
+        cleanDesc = f"{desc[:1000]}..." if len(desc) > 1000 else desc
+        return (
+            f"<b>{article['title']}</b>\n"
+            f"{cleanDesc}\n\n"
+            f"المصدر: <b>{SOURCE_NAME}</b>"
         )
-        print(f"Get articles from database successfully\n")
 
-        for url in urls:
 
-            if url_exists(collection=masrArticlesNews, url=url):
-                print("Url in database - Skipping")
-                continue
-            print("\nUrl not in database - Working")
-            data = getUrlData(url)
-            if not data:
-                print("Faild to get url page - Skipping")
-                continue
-            caption, imageUrl = data
-            # Send to telegram:
-            print("Send message to telegram - Sending...")
-            asyncio.run(
-                send_photo_message(
-                    token=TELEGRAM_TOKEN_MASR_NEWS,
-                    chat_id=TELEGRAM_CHAT_ID,
-                    caption=caption,
-                    photo_url=imageUrl,
-                    source_url=url,
-                )
-            )
-            print("Message sended to telegram successfully")
+def main():
+    run_source(GateAhramSource())
+
 
-            # Save to database:
-            print("Save url to database - Saving...")
-            save_url(
-                collection=masrArticlesNews,
-                data={"article_url": url, "source": SOURCE_NAME},
-            )
-            print("Url saved to database successfully")
-    print("\n✅ All Done - Existting")
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,10 @@
-import os
-import asyncio
-import requests
-from bs4 import BeautifulSoup
-from deep_translator import GoogleTranslator
-from shared.database_service import get_collection, save_url, url_exists
-from shared.telegram_service import send_photo_message
 from dotenv import load_dotenv
+
+load_dotenv()
+
+from bs4 import SoupStrainer
+from shared.html_parser import has_class, image_src
+from shared.source import Source, run_source
 from scripts.real_madrid.configs.as_config import (
     NEWS_URL,
     HEADERS,
@@ -13,24 +12,44 @@ from scripts.real_madrid.configs.as_config import (
     SOURCE_NAME,
 )
 
-load_dotenv()
-
-# Secret Keys:
-TELEGRAM_TOKEN_REAL_MADRID = os.getenv("TELEGRAM_TOKEN_REAL_MADRID")
-TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
-MONGO_URI = os.getenv("MONGO_URI")
-if not all([TELEGRAM_TOKEN_REAL_MADRID, TELEGRAM_CHAT_ID, MONGO_URI]):
-    raise Exception("Missing environment variables")
-translator = GoogleTranslator(source="auto", target="ar")
 
+class AsSource(Source):
+    name = "as"
+    news_url = NEWS_URL
+    headers = HEADERS
+    collection_name = COLLECTION_NAME
+    source_name = SOURCE_NAME
+    translated_fields = ("title", "description")
+    token_env = "TELEGRAM_TOKEN_REAL_MADRID"
+    # Publishes in bursts, those go out as albums:
+    group_mode = "album"
+    duplicate_fields = ("title", "description")
+    listing_strainer = SoupStrainer("div", class_="b_gr b_gr-nh")
+    article_strainer = SoupStrainer("div", class_=has_class("wr-c"))
+
+    def extract_links(self, soup):
+        linksContainer = soup.find("div", class_="b_gr b_gr-nh")
+        if not linksContainer:
+            return []
+
+        newsLinks = []
+        for article in linksContainer.find_all("div", class_="s_h"):
+            hTag = article.find("h3", class_="s_t")
+            if not hTag:
+                continue
+            aTag = hTag.find("a")
+            if not aTag:
+                continue
+            url = aTag.get("href")
+            if not url:
+                continue
+            newsLinks.append(url)
 
-def getUrlData(url):
-    try:
-        response = requests.get(url, timeout=10)
-        if response.status_code != 200:
-            return None
+        # Reverse URLS:
+        newsLinks.reverse()
+        return newsLinks
 
-        soup = BeautifulSoup(response.text, "html.parser")
+    def parse_article(self, soup):
         articleContainer = soup.find("div", class_="wr-c")
         article = articleContainer.find("article")
         if not article:
@@ -40,88 +59,23 @@ def getUrlData(url):
         if not header:
             return None
         textContainer = header.find("div", class_="a_e_txt")
-        title = translator.translate(
-            textContainer.find("h1", class_="a_t").get_text(strip=True)
-        )
-        desc = translator.translate(
-            textContainer.find(class_="a_st").get_text(strip=True)
-        )
+        title = textContainer.find("h1", class_="a_t").get_text(strip=True)
+        desc = textContainer.find(class_="a_st").get_text(strip=True)
         imageContainer = header.find("div", class_="a_e_m")
-        image = imageContainer.find("img").get("src")
-
-        caption = f"<b>{title}</b>\n" f"{desc}\n\n" f"المصدر: <b>صحيفة اّس</b>"
-        return caption, image
-    except Exception:
-        return None
-
-
-print("as Script is Running...")
-
-response = requests.get(
-    url=NEWS_URL,
-    headers=HEADERS,
-    timeout=10,
-)
-if response.status_code == 200:
-    soup = BeautifulSoup(response.text, "html.parser")
-    linksContainer = soup.find("div", class_="b_gr b_gr-nh")
-    articles = linksContainer.find_all("div", class_="s_h")
-
-    newsLinks = []
-
-    for article in articles:
-        hTag = article.find("h3", class_="s_t")
-        if not hTag:
-            continue
-        aTag = hTag.find("a")
-        if not hTag:
-            continue
-        url = aTag.get("href")
-        if not url:
-            continue
-        newsLinks.append(url)
-
-    if newsLinks:
-        # Reverse URLS:
-        newsLinks.reverse()
+        image = image_src(imageContainer.find("img"))
+        return {"title": title, "description": desc, "image": image}
+
+    def render_caption(self, article):
+        return (
+            f"<b>{article['title']}</b>\n"
+            f"{article['description']}\n\n"
+            f"المصدر: <b>صحيفة اّس</b>"
+        )
 
-        try:
 
-            print("Getting articles from database...")
-            realMadridArticlesCollection = get_collection(
-                uri=MONGO_URI, collection_name=COLLECTION_NAME, db_name="my_db"
-            )
-            print(f"Get articles from database successfully\n")
+def main():
+    run_source(AsSource())
 
-            for url in newsLinks:
-                if url_exists(collection=realMadridArticlesCollection, url=url):
-                    print("Url in database - Skipping")
-                    continue
-                print("\nUrl not in database - Working")
-                data = getUrlData(url)
-                if not data:
-                    print("Faild to get url page - Skipping")
-                    continue
-                caption, imageUrl = data
-                # Send to telegram:
-                print("Send message to telegram - Sending...")
-                asyncio.run(
-                    send_photo_message(
-                        token=TELEGRAM_TOKEN_REAL_MADRID,
-                        chat_id=TELEGRAM_CHAT_ID,
-                        caption=caption,
-                        photo_url=imageUrl,
-                        source_url=url,
-                    )
-                )
-                print("Message sended to telegram successfully")
 
-                # Save to database:
-                print("Save url to database - Saving...")
-                save_url(
-                    collection=realMadridArticlesCollection,
-                    data={"article_url": url, "source": SOURCE_NAME},
-                )
-                print("Url saved to database successfully\n")
-        except Exception as e:
-            print(e)
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,10 @@
-import os
-import asyncio
-import requests
-from bs4 import BeautifulSoup
-from deep_translator import GoogleTranslator
-from shared.database_service import get_collection, save_url, url_exists
-from shared.telegram_service import send_photo_message
 from dotenv import load_dotenv
+
+load_dotenv()
+
+from bs4 import SoupStrainer
+from shared.html_parser import has_class, image_src
+from shared.source import Source, run_source
 from scripts.real_madrid.configs.marca_config import (
     NEWS_URL,
     HEADERS,
@@ -13,29 +12,46 @@ from scripts.real_madrid.configs.marca_config import (
     SOURCE_NAME,
 )
 
-load_dotenv()
 
-# Secret Keys:
-TELEGRAM_TOKEN_REAL_MADRID = os.getenv("TELEGRAM_TOKEN_REAL_MADRID")
-TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
-MONGO_URI = os.getenv("MONGO_URI")
-if not all([TELEGRAM_TOKEN_REAL_MADRID, TELEGRAM_CHAT_ID, MONGO_URI]):
-    raise Exception("Missing environment variables")
-translator = GoogleTranslator(source="auto", target="ar")
-
-
-def getUrlData(url):
-    try:
-        response = requests.get(url, timeout=10)
-        if response.status_code != 200:
-            return None
+class MarcaSource(Source):
+    name = "marca"
+    news_url = NEWS_URL
+    headers = HEADERS
+    collection_name = COLLECTION_NAME
+    source_name = SOURCE_NAME
+    translated_fields = ("title", "subtitle", "description")
+    token_env = "TELEGRAM_TOKEN_REAL_MADRID"
+    # Publishes in bursts, those go out as albums:
+    group_mode = "album"
+    duplicate_fields = ("title", "subtitle")
+    listing_strainer = SoupStrainer("article")
+    article_strainer = SoupStrainer(
+        "div", class_=has_class("ue-l-article__body", "ue-l-article__header-content")
+    )
+
+    def extract_links(self, soup):
+        newsLinks = []
+        for article in soup.find_all("article"):
+            articleHeader = article.find("header")
+            if not articleHeader:
+                continue
+            aTag = articleHeader.find("a")
+            if not aTag:
+                continue
+            url = aTag.get("href")
+            if not url:
+                continue
+            newsLinks.append(url)
 
-        soup = BeautifulSoup(response.text, "html.parser")
+        # Reverse URLS:
+        newsLinks.reverse()
+        return newsLinks
 
+    def parse_article(self, soup):
         articleBody = soup.find("div", class_="ue-l-article__body")
         articleHeaderContent = soup.find("div", class_="ue-l-article__header-content")
 
-        if not all([articleBody, articleHeader]):
+        if not all([articleBody, articleHeaderContent]):
             print("Missing elements = Skipping")
             return None
 
@@ -48,103 +64,36 @@ def getUrlData(url):
             print("Missing elements = Skipping")
             return None
 
-        image = imageEle.get("src")
-        title = translator.translate(titleEle.get_text(strip=True))
-        subTitle = translator.translate(subTitle.get_text(strip=True))
-        fullDescription = None
+        descriptionText = f""
         if fullDescriptionEle:
-            pTags = fullDescriptionEle.find_all("p")
-            descriptionText = f""
-            if pTags:
-                for p in pTags:
-                    descriptionText += f"{p.get_text(strip=True)}\n"
-            fullDescription = translator.translate(descriptionText)
-
+            for p in fullDescriptionEle.find_all("p"):
+                descriptionText += f"{p.get_text(strip=True)}\n"
+
+        return {
+            "title": titleEle.get_text(strip=True),
+            "subtitle": subTitle.get_text(strip=True),
+            "description": descriptionText,
+            "image": image_src(imageEle),
+        }
+
+    def render_caption(self, article):
+        fullDescription = article["description"]
         cleanDescription = (
             f"{fullDescription[:800]}..."
             if len(fullDescription) > 800
             else fullDescription
         )
-
-        caption = (
-            f"<b>{title}</b>\n\n"
-            f"{subTitle}\n\n"
+        return (
+            f"<b>{article['title']}</b>\n\n"
+            f"{article['subtitle']}\n\n"
             f"{cleanDescription}\n\n"
             f"المصدر: <b>صحيفة ماركا</b>"
         )
-        return caption, image
-    except Exception:
-        return None
 
 
-print("\nmarca Script is Running...")
+def main():
+    run_source(MarcaSource())
 
-response = requests.get(
-    url=NEWS_URL,
-    headers=HEADERS,
-    timeout=10,
-)
-responseCode = response.status_code
-
-if responseCode == 200:
-    print(f"Response Sucess: CODE IS: {responseCode}\n")
-    soup = BeautifulSoup(response.text, "html.parser")
-    articles = soup.find_all("article")
-    newsLinks = []
-
-    for article in articles:
-        articleHeader = article.find("header")
-        if not articleHeader:
-            continue
-        aTag = articleHeader.find("a")
-        if not articleHeader:
-            continue
-        url = aTag.get("href")
-        if not url:
-            continue
-        newsLinks.append(url)
-    if newsLinks:
-        # Reverse URLS:
-        newsLinks.reverse()
 
-        try:
-
-            print("Getting articles from database...")
-            realMadridArticlesCollection = get_collection(
-                uri=MONGO_URI, collection_name=COLLECTION_NAME, db_name="my_db"
-            )
-            print(f"Get articles from database successfully\n")
-
-            for url in newsLinks:
-                if url_exists(collection=realMadridArticlesCollection, url=url):
-                    print("Url in database - Skipping")
-                    continue
-                print("\nUrl not in database - Working")
-                data = getUrlData(url)
-                if not data:
-                    print(f"Url For Check: {url}")
-                    continue
-                caption, imageUrl = data
-                # Send to telegram:
-                print("Send message to telegram - Sending...")
-                asyncio.run(
-                    send_photo_message(
-                        token=TELEGRAM_TOKEN_REAL_MADRID,
-                        chat_id=TELEGRAM_CHAT_ID,
-                        caption=caption,
-                        photo_url=imageUrl,
-                        source_url=url,
-                    )
-                )
-                print("Message sended to telegram successfully")
-
-                # Save to database:
-                print("Save url to database - Saving...")
-                save_url(
-                    collection=realMadridArticlesCollection,
-                    data={"article_url": url, "source": SOURCE_NAME},
-                )
-                print("Url saved to database successfully")
-            print("\n✅ All Done - Exiting")
-        except Exception as e:
-            print(e)
+if __name__ == "__main__":
+    main()
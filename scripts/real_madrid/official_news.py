@@ -1,10 +1,10 @@
-import os
-import asyncio
-import requests
-from bs4 import BeautifulSoup
-from shared.database_service import get_collection, save_url, url_exists
-from shared.telegram_service import send_photo_message
 from dotenv import load_dotenv
+
+load_dotenv()
+
+from bs4 import SoupStrainer
+from shared.html_parser import has_class, image_src
+from shared.source import MINUTE, Source, run_source
 from scripts.real_madrid.configs.official_news_config import (
     BASE_URL,
     NEWS_URL,
@@ -13,23 +13,30 @@ from scripts.real_madrid.configs.official_news_config import (
     SOURCE_NAME,
 )
 
-load_dotenv()
 
-# Secret Keys:
-TELEGRAM_TOKEN_REAL_MADRID = os.getenv("TELEGRAM_TOKEN_REAL_MADRID")
-TELEGRAM_CHAT_ID = os.getenv("TELEGRAM_CHAT_ID")
-MONGO_URI = os.getenv("MONGO_URI")
-if not all([TELEGRAM_TOKEN_REAL_MADRID, TELEGRAM_CHAT_ID, MONGO_URI]):
-    raise Exception("Missing environment variables")
+class OfficialNewsSource(Source):
+    name = "official_news"
+    interval = 30 * MINUTE
+    news_url = NEWS_URL
+    headers = HEADERS
+    collection_name = COLLECTION_NAME
+    source_name = SOURCE_NAME
+    token_env = "TELEGRAM_TOKEN_REAL_MADRID"
+    listing_strainer = SoupStrainer("div", class_=has_class("rm-news__list"))
+    article_strainer = SoupStrainer("article")
 
+    def extract_links(self, soup):
+        urlsExtracted = []
 
-def getUrlData(url):
-    try:
-        response = requests.get(url, timeout=10)
-        if response.status_code != 200:
-            return None
+        # Extrac Urls:
+        for newsList in soup.find_all("div", class_="rm-news__list"):
+            for link in newsList.find_all("a", href=True):
+                urlsExtracted.append(f"{BASE_URL}{link.get('href')}")
+
+        urlsExtracted.reverse()
+        return urlsExtracted
 
-        soup = BeautifulSoup(response.text, "html.parser")
+    def parse_article(self, soup):
         article = soup.find("article")
         if not article:
             return None
@@ -44,88 +51,20 @@ def getUrlData(url):
             .find("p")
             .get_text(strip=True)
         )
-        image = header.find("img", class_="news-detail__img").get("src")
+        image = image_src(header.find("img", class_="news-detail__img"))
+        return {"title": title, "description": desc, "image": image}
 
-        caption = (
-            f"<b>{title}</b>\n"
-            f"{desc}\n\n"
+    def render_caption(self, article):
+        return (
+            f"<b>{article['title']}</b>\n"
+            f"{article['description']}\n\n"
             f"المصدر: <b>الموقع الرسمي لريال مدريد</b>"
         )
-        return caption, image
-    except Exception:
-        return None
-
-
-print("official_news Script is Running...")
-
-newsListsElements = []
-response = requests.get(
-    url=NEWS_URL,
-    headers=HEADERS,
-    timeout=10,
-)
-if response.status_code == 200:
-    soup = BeautifulSoup(response.text, "html.parser")
-    newsListsElements = soup.find_all("div", class_="rm-news__list")
-
-    if newsListsElements:
-
-        urlsExtracted = []
-        newsUrlsList = []
-
-        # Extrac Urls:
-        for newsList in newsListsElements:
-            links = newsList.find_all("a", href=True)
-            for link in links:
-                urlsExtracted.append(f"{BASE_URL}{link.get('href')}")
-
-        # Set Urls:
-        urlsExtracted.reverse()
-
-        for url in urlsExtracted:
-            newsUrlsList.append(url)
-
-        try:
-
-            print("Getting articles from database...")
-            realMadridArticlesCollection = get_collection(
-                uri=MONGO_URI, collection_name=COLLECTION_NAME, db_name="my_db"
-            )
-            print(f"Get articles from database successfully\n")
-
-            for url in newsUrlsList:
-                if url_exists(collection=realMadridArticlesCollection, url=url):
-                    print("Url in database - Skipping")
-                    continue
-                print("\nUrl not in database - Working")
-                data = getUrlData(url)
-                if not data:
-                    print("Faild to get url page - Skipping")
-                    continue
 
-                caption, imageUrl = data
 
-                # Send to telegram:
-                print("Send message to telegram - Sending...")
-                asyncio.run(
-                    send_photo_message(
-                        token=TELEGRAM_TOKEN_REAL_MADRID,
-                        chat_id=TELEGRAM_CHAT_ID,
-                        caption=caption,
-                        photo_url=imageUrl,
-                        source_url=url,
-                    )
-                )
-                print("Message sended to telegram successfully")
+def main():
+    run_source(OfficialNewsSource())
 
-                # Save to database:
-                print("Save url to database - Saving...")
-                save_url(
-                    collection=realMadridArticlesCollection,
-                    data={"article_url": url, "source": SOURCE_NAME},
-                )
-                print("Url saved to database successfully\n")
 
-            print("Script End - Exitting...")
-        except Exception as e:
-            print(e)
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import time
+import asyncio
+import argparse
+import importlib
+from dotenv import load_dotenv
+
+# Before any shared or source module, they read their settings on import:
+load_dotenv()
+
+from shared.database_service import close_clients
+from shared.event_loop import run_sync
+from shared.http_service import close_fetcher
+from shared.state_store import load_state, save_state
+from shared.telegram_service import close_senders
+
+# name: "module:class", intervals come from each source class:
+SOURCES = {
+    "gate_ahram": "scripts.masr.gate_ahram:GateAhramSource",
+    "as": "scripts.real_madrid.as:AsSource",
+    "marca": "scripts.real_madrid.marca:MarcaSource",
+    "official_news": "scripts.real_madrid.official_news:OfficialNewsSource",
+    "nvd_api": "scripts.cve.nvd_api:NvdSource",
+}
+# With --once, when each source last started, a source runs once its interval passed:
+RUNS_STATE = "runner"
+# Cron ticks start a few minutes late, a source this close to its interval is due:
+TICK_SLACK = 5 * 60
+
+
+def load_source(name):
+    moduleName, className = SOURCES[name].split(":")
+    return getattr(importlib.import_module(moduleName), className)()
+
+
+async def run_once(source):
+    try:
+        await source.run()
+    except Exception as e:
+        print(f"{source.name} run faild: {e!r}")
+
+
+async def run_forever(source):
+    loop = asyncio.get_running_loop()
+    while True:
+        startedAt = loop.time()
+        await run_once(source)
+        await asyncio.sleep(max(0, source.interval - (loop.time() - startedAt)))
+
+
+def due_sources(sources, lastRuns, now):
+    due = []
+    for source in sources:
+        elapsed = now - lastRuns.get(source.name, 0)
+        if elapsed < source.interval - TICK_SLACK:
+            print(f"{source.name} ran {elapsed / 60:.0f} minutes ago - Skipping")
+            continue
+        due.append(source)
+    return due
+
+
+async def run(names, once=False, force=False):
+    # Every source shares the process Mongo pool, http pool and Telegram senders:
+    sources = [load_source(name) for name in names]
+    if once:
+        lastRuns = await asyncio.to_thread(load_state, RUNS_STATE)
+        startedAt = time.time()
+        if not force:
+            sources = due_sources(sources, lastRuns, startedAt)
+        await asyncio.gather(*(run_once(source) for source in sources))
+        lastRuns.update((source.name, startedAt) for source in sources)
+        await asyncio.to_thread(save_state, RUNS_STATE, lastRuns)
+        return
+    await asyncio.gather(*(run_forever(source) for source in sources))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run news sources in one process")
+    parser.add_argument(
+        "sources",
+        nargs="*",
+        help=f"sources to run (default: all of {', '.join(SOURCES)})",
+    )
+    parser.add_argument(
+        "--once",
+        action="store_true",
+        help="run every source whose interval passed once and exit (cron ticks)",
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="with --once, ignore the intervals"
+    )
+    args = parser.parse_args()
+    unknown = set(args.sources) - set(SOURCES)
+    if unknown:
+        parser.error(f"unknown sources: {', '.join(sorted(unknown))}")
+
+    try:
+        run_sync(run(args.sources or list(SOURCES), once=args.once, force=args.force))
+    except KeyboardInterrupt:
+        print("\nRunner stopped")
+    finally:
+        close_senders()
+        close_fetcher()
+        close_clients()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,166 @@
-from pymongo.mongo_client import MongoClient
-from pymongo.server_api import ServerApi
+import os
+import atexit
+import threading
+from datetime import datetime, timedelta, timezone
 
+MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "10"))
+# Claims stay pending until confirmed, one older than this belongs to a run that
+# died before sending and may be claimed again:
+PENDING_FIELD = "pending"
+CLAIMED_AT_FIELD = "claimed_at"
+CLAIM_TIMEOUT = timedelta(minutes=float(os.getenv("CLAIM_TIMEOUT_MINUTES", "30")))
 
-def get_collection(uri, db_name, collection_name):
-    client = MongoClient(uri, server_api=ServerApi("1"))
+# pymongo is imported on first use, runs that never reach the database skip it.
+# One client (and connection pool) per uri for the whole process:
+_clients = {}
+_indexedFields = set()
+_clientsLock = threading.Lock()
+
+
+def get_client(uri, max_pool_size=None):
+    with _clientsLock:
+        client = _clients.get(uri)
+        if client is None and uri.startswith("mongomock://"):
+            # In-memory stand-in for benchmarks, only needs mongomock installed:
+            import mongomock
+
+            client = mongomock.MongoClient()
+            _clients[uri] = client
+        elif client is None:
+            from pymongo.mongo_client import MongoClient
+            from pymongo.server_api import ServerApi
+
+            client = MongoClient(
+                uri,
+                server_api=ServerApi("1"),
+                maxPoolSize=max_pool_size or MAX_POOL_SIZE,
+                connect=False,
+            )
+            _clients[uri] = client
+        return client
+
+
+def close_clients():
+    with _clientsLock:
+        while _clients:
+            _, client = _clients.popitem()
+            client.close()
+        _indexedFields.clear()
+
+
+atexit.register(close_clients)
+
+
+def get_collection(uri, db_name, collection_name, unique_key=None):
+    client = get_client(uri)
     db = client.get_database(db_name)
-    return db.get_collection(collection_name)
+    collection = db.get_collection(collection_name)
+    if unique_key:
+        indexKey = (uri, db_name, collection_name, unique_key)
+        if indexKey not in _indexedFields:
+            _ensure_unique_index(collection, unique_key)
+            _indexedFields.add(indexKey)
+    return collection
+
+
+def _ensure_unique_index(collection, field):
+    from pymongo.errors import OperationFailure
+
+    try:
+        collection.create_index(field, unique=True, name=f"{field}_unique")
+    except OperationFailure as e:
+        # Existing duplicates block the index, lookups still work without it:
+        print(f"Unique index on {collection.name}.{field} not created: {e}")
+
+
+def _is_stale(document, cutoff):
+    claimedAt = document.get(CLAIMED_AT_FIELD)
+    if claimedAt is None:
+        return True
+    # pymongo hands datetimes back naive, in UTC:
+    if claimedAt.tzinfo is None:
+        claimedAt = claimedAt.replace(tzinfo=timezone.utc)
+    return claimedAt < cutoff
+
+
+def lookup_keys(collection, field, keys):
+    # (unseen, settled) in the caller's order, from one $in query: unseen keys are
+    # free to claim, settled ones were delivered (or saved before claims existed):
+    keys = list(dict.fromkeys(key for key in keys if key))
+    if not keys:
+        return [], []
+    cutoff = datetime.now(timezone.utc) - CLAIM_TIMEOUT
+    taken = set()
+    settled = set()
+    for doc in collection.find(
+        {field: {"$in": keys}},
+        {field: 1, PENDING_FIELD: 1, CLAIMED_AT_FIELD: 1, "_id": 0},
+    ):
+        if not doc.get(PENDING_FIELD):
+            settled.add(doc[field])
+            taken.add(doc[field])
+        elif not _is_stale(doc, cutoff):
+            taken.add(doc[field])
+    return (
+        [key for key in keys if key not in taken],
+        [key for key in keys if key in settled],
+    )
+
+
+def _save_one(collection, document):
+    from pymongo.errors import DuplicateKeyError
+
+    try:
+        collection.insert_one(document)
+    except DuplicateKeyError:
+        pass
+
+
+def claim(collection, field, document):
+    # Check and write in one round trip, only the run that inserts wins:
+    from pymongo.errors import DuplicateKeyError
+
+    now = datetime.now(timezone.utc)
+    document = {CLAIMED_AT_FIELD: now, **document, PENDING_FIELD: True}
+    try:
+        result = collection.update_one(
+            {field: document[field]}, {"$setOnInsert": document}, upsert=True
+        )
+    except DuplicateKeyError:
+        return False
+    if result.upserted_id is not None:
+        return True
+    # Take over a stale pending claim, only one run can match its old claimed_at:
+    result = collection.update_one(
+        {
+            field: document[field],
+            PENDING_FIELD: True,
+            CLAIMED_AT_FIELD: {"$lt": now - CLAIM_TIMEOUT},
+        },
+        {"$set": document},
+    )
+    return result.modified_count == 1
+
+
+def release(collection, field, key):
+    collection.delete_one({field: key})
+
+
+def confirm(collection, field, keys):
+    # Mark claimed items as delivered, one round trip for the whole batch:
+    keys = list(keys)
+    if keys:
+        collection.update_many(
+            {field: {"$in": keys}},
+            {
+                "$set": {"sent_at": datetime.now(timezone.utc)},
+                "$unset": {PENDING_FIELD: ""},
+            },
+        )
 
 
 def save_url(collection, data):
-    collection.insert_one(data)
+    _save_one(collection, data)
 
 
 def url_exists(collection, url):
@@ -18,7 +169,7 @@ def url_exists(collection, url):
 
 # -------- CVE helpers --------
 def save_cve(collection, cve_data):
-    collection.insert_one(cve_data)
+    _save_one(collection, cve_data)
 
 
 def cve_exists(collection, cveId):
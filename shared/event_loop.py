@@ -0,0 +1,26 @@
+import atexit
+import asyncio
+import threading
+
+# One event loop for the whole process, shared by every sync entry point:
+_runner = None
+_runnerLock = threading.Lock()
+
+
+def run_sync(coro):
+    global _runner
+    with _runnerLock:
+        if _runner is None:
+            _runner = asyncio.Runner()
+    return _runner.run(coro)
+
+
+def close_loop():
+    global _runner
+    with _runnerLock:
+        if _runner is not None:
+            _runner.close()
+            _runner = None
+
+
+atexit.register(close_loop)
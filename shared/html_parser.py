@@ -0,0 +1,43 @@
+from importlib.util import find_spec
+
+# Checked without importing, bs4 and lxml load with the first page parsed:
+PARSER = "lxml" if find_spec("lxml") else "html.parser"
+
+
+def has_class(*names):
+    # Strainers see the raw class attribute, so match on any single class name:
+    wanted = set(names)
+
+    def matches(value):
+        if not value:
+            return False
+        classes = value.split() if isinstance(value, str) else value
+        return not wanted.isdisjoint(classes)
+
+    return matches
+
+
+def make_soup(response, parse_only=None):
+    # Decode the raw bytes ourselves: header charset first, then the page's <meta>:
+    from bs4 import BeautifulSoup
+
+    return BeautifulSoup(
+        response.content,
+        PARSER,
+        parse_only=parse_only,
+        from_encoding=getattr(response, "charset_encoding", None),
+    )
+
+
+# Lazy-loading pages keep the real url in a data attribute and a placeholder in src:
+LAZY_SRC_ATTRS = ("data-src", "data-lazy-src", "data-original", "src")
+
+
+def image_src(img):
+    if img is None:
+        return None
+    for attr in LAZY_SRC_ATTRS:
+        value = (img.get(attr) or "").strip()
+        if value and not value.startswith("data:"):
+            return value
+    return None
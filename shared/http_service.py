@@ -0,0 +1,102 @@
+import os
+import atexit
+import asyncio
+from contextlib import asynccontextmanager
+from urllib.parse import urlsplit
+import httpx
+from shared import metrics
+from shared.event_loop import run_sync
+
+TIMEOUT = 10
+MAX_CONNECTIONS = 20
+PER_HOST_CONCURRENCY = int(os.getenv("HTTP_PER_HOST_CONCURRENCY", "4"))
+
+
+class HttpFetcher:
+    # One keep-alive connection pool, bounded per host:
+    def __init__(
+        self,
+        per_host_concurrency=PER_HOST_CONCURRENCY,
+        max_connections=MAX_CONNECTIONS,
+        timeout=TIMEOUT,
+    ):
+        self.per_host_concurrency = per_host_concurrency
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._client = None
+        self._hostLimits = {}
+
+    def _get_client(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                timeout=self.timeout,
+                follow_redirects=True,
+            )
+        return self._client
+
+    def _host_limit(self, url):
+        host = urlsplit(url).netloc
+        limit = self._hostLimits.get(host)
+        if limit is None:
+            limit = asyncio.Semaphore(self.per_host_concurrency)
+            self._hostLimits[host] = limit
+        return limit
+
+    async def fetch_async(
+        self, url, headers=None, params=None, timeout=httpx.USE_CLIENT_DEFAULT
+    ):
+        metrics.count("http_requests")
+        async with self._host_limit(url):
+            return await self._get_client().get(
+                url, headers=headers, params=params, timeout=timeout
+            )
+
+    @asynccontextmanager
+    async def stream_async(
+        self, url, headers=None, params=None, timeout=httpx.USE_CLIENT_DEFAULT
+    ):
+        # Response with an unread body, for reading large payloads in chunks:
+        metrics.count("http_requests")
+        async with self._host_limit(url):
+            async with self._get_client().stream(
+                "GET", url, headers=headers, params=params, timeout=timeout
+            ) as response:
+                yield response
+
+    async def close_async(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+        self._hostLimits = {}
+
+    def close(self):
+        if self._client is not None:
+            run_sync(self.close_async())
+
+
+_fetcher = None
+
+
+def get_fetcher():
+    global _fetcher
+    if _fetcher is None:
+        _fetcher = HttpFetcher()
+    return _fetcher
+
+
+def close_fetcher():
+    global _fetcher
+    if _fetcher is not None:
+        try:
+            _fetcher.close()
+        except Exception as e:
+            print(f"Http fetcher not closed cleanly: {e}")
+        _fetcher = None
+
+
+# Registered after shared.event_loop, so it runs before the loop is closed:
+atexit.register(close_fetcher)
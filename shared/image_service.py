@@ -0,0 +1,128 @@
+import io
+import os
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from importlib.util import find_spec
+from shared.state_store import STATE_DIR
+
+# Pillow is optional and only imported when an image is actually downscaled:
+CAN_RESIZE = find_spec("PIL") is not None
+
+# Upload images ourselves instead of letting Telegram fetch the url:
+PREFETCH_IMAGES = os.getenv("IMAGE_PREFETCH", "").lower() in ("1", "true", "yes")
+
+# Telegram takes photos up to 10 MB, jpeg/png/webp:
+MAX_IMAGE_BYTES = 10 * 1024 * 1024
+IMAGE_TYPES = ("image/jpeg", "image/png", "image/webp")
+# Longer sides are downscaled when Pillow is installed:
+MAX_IMAGE_SIDE = int(os.getenv("IMAGE_MAX_SIDE", "2560"))
+FILE_ID_CACHE_PATH = os.path.join(STATE_DIR, "telegram_files.sqlite")
+
+
+class InvalidImage(Exception):
+    pass
+
+
+def validate_image(response):
+    # Image bytes of a fetched photo, or InvalidImage:
+    if response is None or response.status_code != 200:
+        code = getattr(response, "status_code", None)
+        raise InvalidImage(f"image not fetched - CODE IS: {code}")
+    contentType = response.headers.get("Content-Type", "").split(";")[0].strip()
+    if contentType.lower() not in IMAGE_TYPES:
+        raise InvalidImage(f"not a photo: {contentType or 'no content type'}")
+    content = response.content
+    if not content:
+        raise InvalidImage("empty image")
+    if len(content) > MAX_IMAGE_BYTES:
+        raise InvalidImage(f"image too large: {len(content)} bytes")
+    return content
+
+
+def downscale_image(content, max_side=MAX_IMAGE_SIDE):
+    # Same bytes back when Pillow is missing or the image is small enough:
+    if not CAN_RESIZE:
+        return content
+    from PIL import Image
+
+    with Image.open(io.BytesIO(content)) as image:
+        if max(image.size) <= max_side:
+            return content
+        image.thumbnail((max_side, max_side))
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=85)
+        return output.getvalue()
+
+
+async def prefetch_image(fetcher, url, headers=None):
+    response = await fetcher.fetch_async(url, headers=headers)
+    content = validate_image(response)
+    return await asyncio.to_thread(downscale_image, content)
+
+
+class FileIdCache:
+    # Telegram file_id per bot and image url, so each image is uploaded once:
+    def __init__(self, path=FILE_ID_CACHE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._memory = {}
+        self._db = None
+
+    def _get_db(self):
+        if self._db is None and self.path:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS file_ids (key TEXT PRIMARY KEY, file_id TEXT)"
+            )
+        return self._db
+
+    @staticmethod
+    def _key(bot_id, url):
+        return hashlib.sha256(f"{bot_id}:{url}".encode("utf-8")).hexdigest()
+
+    def get(self, bot_id, url):
+        key = self._key(bot_id, url)
+        with self._lock:
+            if key not in self._memory:
+                db = self._get_db()
+                row = (
+                    db.execute(
+                        "SELECT file_id FROM file_ids WHERE key = ?", (key,)
+                    ).fetchone()
+                    if db
+                    else None
+                )
+                self._memory[key] = row[0] if row else None
+            return self._memory[key]
+
+    def set(self, bot_id, url, file_id):
+        key = self._key(bot_id, url)
+        with self._lock:
+            self._memory[key] = file_id
+            db = self._get_db()
+            if db:
+                with db:
+                    db.execute(
+                        "INSERT OR REPLACE INTO file_ids VALUES (?, ?)", (key, file_id)
+                    )
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_fileIds = None
+
+
+def get_file_id_cache():
+    global _fileIds
+    if _fileIds is None:
+        _fileIds = FileIdCache()
+    return _fileIds
@@ -0,0 +1,69 @@
+import re
+import json
+import codecs
+
+SEPARATORS = re.compile(r"[\s,]*")
+
+
+class JsonArrayStream:
+    # Reads {"field": ..., "key": [item, item, ...]} from byte chunks one item
+    # at a time, so only the current item is ever fully decoded in memory:
+    def __init__(self, chunks, key):
+        self._chunks = chunks.__aiter__()
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._decoder = json.JSONDecoder()
+        # Header fields are scalars, so the first match is the top level key:
+        self._keyPattern = re.compile(rf'"{re.escape(key)}"\s*:\s*\[')
+        self._buffer = ""
+        self._ended = False
+        self._arrayDone = False
+        self.header = None
+
+    async def _read(self):
+        # False once the body is exhausted:
+        if self._ended:
+            return False
+        try:
+            chunk = await self._chunks.__anext__()
+        except StopAsyncIteration:
+            self._ended = True
+            self._buffer += self._text.decode(b"", final=True)
+            return False
+        self._buffer += self._text.decode(chunk)
+        return True
+
+    async def read_header(self):
+        # Fields before the array, or the whole body when it has no such array:
+        while self.header is None:
+            match = self._keyPattern.search(self._buffer)
+            if match:
+                head = self._buffer[: match.start()].rstrip().rstrip(",")
+                self.header = json.loads(f"{head}}}")
+                self._buffer = self._buffer[match.end() :]
+            elif not await self._read():
+                self.header = json.loads(self._buffer) if self._buffer.strip() else {}
+                self._buffer = ""
+                self._arrayDone = True
+        return self.header
+
+    async def items(self):
+        await self.read_header()
+        while not self._arrayDone:
+            start = SEPARATORS.match(self._buffer).end()
+            if start == len(self._buffer):
+                if not await self._read():
+                    raise ValueError("JSON body ended inside the array")
+                continue
+            if self._buffer[start] == "]":
+                self._arrayDone = True
+                return
+
+            try:
+                item, end = self._decoder.raw_decode(self._buffer, start)
+            except json.JSONDecodeError:
+                # Item not complete yet, wait for the next chunk:
+                if not await self._read():
+                    raise
+                continue
+            self._buffer = self._buffer[end:]
+            yield item
@@ -0,0 +1,204 @@
+import os
+import json
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from shared.state_store import STATE_DIR
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# JSON report of every run, plus an optional Prometheus textfile collector dir:
+REPORT_DIR = os.getenv("METRICS_REPORT_DIR", os.path.join(STATE_DIR, "reports"))
+PROMETHEUS_DIR = os.getenv("METRICS_PROMETHEUS_DIR")
+PROMETHEUS_PREFIX = "news_bot"
+
+_current = contextvars.ContextVar("run_metrics", default=None)
+
+
+class RunMetrics:
+    # Stage timings, counters and skip reasons of one source run.
+    # Parse and translate run in threads, so every update takes the lock:
+    def __init__(self, source):
+        self.source = source
+        self.started_at = datetime.now(timezone.utc)
+        self._startedAt = time.perf_counter()
+        self._seconds = None
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._counts = {}
+        self._skipped = {}
+
+    def add_time(self, stage, seconds):
+        with self._lock:
+            stats = self._stages.setdefault(
+                stage, {"calls": 0, "seconds": 0.0, "max_seconds": 0.0}
+            )
+            stats["calls"] += 1
+            stats["seconds"] += seconds
+            stats["max_seconds"] = max(stats["max_seconds"], seconds)
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self._counts[name] = self._counts.get(name, 0) + amount
+
+    def skip(self, reason, amount=1):
+        if not amount:
+            return
+        with self._lock:
+            self._skipped[reason] = self._skipped.get(reason, 0) + amount
+
+    def finish(self):
+        if self._seconds is None:
+            self._seconds = time.perf_counter() - self._startedAt
+
+    def report(self):
+        with self._lock:
+            seconds = self._seconds
+            if seconds is None:
+                seconds = time.perf_counter() - self._startedAt
+            return {
+                "source": self.source,
+                "started_at": self.started_at.isoformat(),
+                "seconds": seconds,
+                "stages": {
+                    stage: {
+                        **stats,
+                        "mean_seconds": stats["seconds"] / stats["calls"],
+                    }
+                    for stage, stats in self._stages.items()
+                },
+                "counts": dict(self._counts),
+                "skipped": dict(self._skipped),
+                "peak_rss_bytes": peak_rss_bytes(),
+            }
+
+
+def peak_rss_bytes():
+    # Process peak, ru_maxrss is in kilobytes on Linux:
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def start_run(source):
+    # Metrics of the run in this task, tasks and threads it starts inherit them:
+    metrics = RunMetrics(source)
+    return metrics, _current.set(metrics)
+
+
+def end_run(token):
+    _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+@contextmanager
+def stage(name):
+    metrics = _current.get()
+    startedAt = time.perf_counter()
+    try:
+        yield
+    finally:
+        if metrics is not None:
+            metrics.add_time(name, time.perf_counter() - startedAt)
+
+
+def count(name, amount=1):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.count(name, amount)
+
+
+def skip(reason, amount=1):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.skip(reason, amount)
+
+
+# -------- Output --------
+def _write_atomic(path, text):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmpPath = f"{path}.tmp"
+    with open(tmpPath, "w", encoding="utf-8") as reportFile:
+        reportFile.write(text)
+    os.replace(tmpPath, path)
+
+
+def _label(text):
+    text = str(text).replace("\\", "\\\\").replace('"', '\\"')
+    return text.replace("\n", "\\n")
+
+
+def to_prometheus(report):
+    # Text exposition format, for the node_exporter textfile collector:
+    source = report["source"]
+    lines = []
+
+    def metric(name, help, samples):
+        fullName = f"{PROMETHEUS_PREFIX}_{name}"
+        lines.append(f"# HELP {fullName} {help}")
+        lines.append(f"# TYPE {fullName} gauge")
+        for labels, value in samples:
+            labelText = ",".join(
+                f'{label}="{_label(text)}"'
+                for label, text in {"source": source, **labels}.items()
+            )
+            lines.append(f"{fullName}{{{labelText}}} {value}")
+
+    metric(
+        "run_timestamp_seconds",
+        "Start of the last run.",
+        [({}, report["started_at_epoch"])],
+    )
+    metric("run_seconds", "Duration of the last run.", [({}, report["seconds"])])
+    metric(
+        "stage_seconds",
+        "Time spent in each stage during the last run.",
+        [({"stage": s}, stats["seconds"]) for s, stats in report["stages"].items()],
+    )
+    metric(
+        "stage_calls",
+        "Calls of each stage during the last run.",
+        [({"stage": s}, stats["calls"]) for s, stats in report["stages"].items()],
+    )
+    metric(
+        "count",
+        "Items and requests counted during the last run.",
+        [({"name": name}, value) for name, value in report["counts"].items()],
+    )
+    metric(
+        "skipped_items",
+        "Items skipped during the last run, by reason.",
+        [({"reason": reason}, value) for reason, value in report["skipped"].items()],
+    )
+    if report["peak_rss_bytes"] is not None:
+        metric(
+            "peak_rss_bytes",
+            "Peak resident memory of the process.",
+            [({}, report["peak_rss_bytes"])],
+        )
+    return "\n".join(lines) + "\n"
+
+
+def write_reports(metrics, report_dir=REPORT_DIR, prometheus_dir=PROMETHEUS_DIR):
+    report = metrics.report()
+    if report_dir:
+        _write_atomic(
+            os.path.join(report_dir, f"{metrics.source}.json"),
+            json.dumps(report, indent=2),
+        )
+    if prometheus_dir:
+        _write_atomic(
+            os.path.join(prometheus_dir, f"{metrics.source}.prom"),
+            to_prometheus(
+                {**report, "started_at_epoch": metrics.started_at.timestamp()}
+            ),
+        )
+    return report
@@ -0,0 +1,232 @@
+import os
+import asyncio
+from shared import metrics
+
+PREPARE_WORKERS = int(os.getenv("PIPELINE_PREPARE_WORKERS", "8"))
+# Items prepared but not sent yet, bounds pages and images held under a burst:
+MAX_IN_FLIGHT = int(os.getenv("PIPELINE_MAX_IN_FLIGHT", "16"))
+
+_DONE = object()
+
+
+class Pipeline:
+    # prepare -> claim -> send -> persist, every stage runs alongside the others.
+    # prepare runs on a worker pool, claim and send keep the listing order.
+    # Stages are coroutine functions:
+    #   prepare(key, payload) -> message, None when it faild, False to filter it out
+    #   filtered(key) after prepare filtered an item out
+    #   claim(key) -> True when this run won the item, False when another run did,
+    #   None when the item turned out to be filtered out after all
+    #   send(key, message) raises when the message was not delivered
+    #   release(key) after a faild send, persist(keys) after delivered ones
+    #   send_batch([(key, message), ...]) delivers up to batch_size items at once,
+    #   all or none of them, a batch of one or a faild batch goes through send
+    #   unknown_outcome: errors of send and send_batch that leave it open whether
+    #   the items went out, those count as delivered so they are never sent twice
+    def __init__(
+        self,
+        prepare,
+        claim,
+        send,
+        release,
+        persist,
+        filtered=None,
+        send_batch=None,
+        batch_size=1,
+        unknown_outcome=(),
+        workers=PREPARE_WORKERS,
+        max_in_flight=MAX_IN_FLIGHT,
+    ):
+        self.prepare = prepare
+        self.claim = claim
+        self.send = send
+        self.release = release
+        self.persist = persist
+        self.filtered = filtered
+        self.send_batch = send_batch
+        self.batch_size = batch_size if send_batch else 1
+        self.unknown_outcome = tuple(unknown_outcome)
+        self.workers = workers
+        # A batch waits in flight until it is full:
+        self.max_in_flight = max(max_in_flight, self.batch_size)
+        self.delivered = 0
+        self.failed = 0
+        # Error of each faild item, None when its message faild to build:
+        self.failures = {}
+
+    async def run(self, items):
+        # (delivered, failed) once every item went through every stage:
+        items = list(items)
+        loop = asyncio.get_running_loop()
+        self._inFlight = asyncio.Semaphore(self.max_in_flight)
+        self._prepareQueue = asyncio.Queue(maxsize=self.workers)
+        self._sendQueue = asyncio.Queue(maxsize=self.max_in_flight)
+        self._persistQueue = asyncio.Queue()
+        self._results = [loop.create_future() for _ in items]
+
+        workers = [self._prepare_worker() for _ in range(min(self.workers, len(items)))]
+        await asyncio.gather(
+            self._feed(items, len(workers)),
+            *workers,
+            self._order(items),
+            self._send_worker(),
+            self._persist_worker(),
+        )
+        return self.delivered, self.failed
+
+    async def _feed(self, items, workers):
+        for index, item in enumerate(items):
+            await self._inFlight.acquire()
+            await self._prepareQueue.put((index, item))
+        for _ in range(workers):
+            await self._prepareQueue.put(_DONE)
+
+    async def _prepare_worker(self):
+        while True:
+            entry = await self._prepareQueue.get()
+            if entry is _DONE:
+                return
+            index, (key, payload) = entry
+            try:
+                message = await self.prepare(key, payload)
+            except Exception as e:
+                print(f"Faild to prepare {key}: {e!r}")
+                message = None
+            self._results[index].set_result(message)
+
+    async def _order(self, items):
+        # Waits for each item in listing order, so later items never overtake:
+        for (key, _), result in zip(items, self._results):
+            message = await result
+            print(f"\n{key} not in database - Working")
+            if message is False:
+                print("Item filtered out - Skipping")
+                metrics.skip("filtered")
+                await self._filtered(key)
+            elif not message:
+                print("Faild to build message - Skipping")
+                metrics.skip("build_failed")
+                self._failed(key, None)
+            elif await self._claim(key):
+                await self._sendQueue.put((key, message))
+                continue
+            self._inFlight.release()
+        await self._sendQueue.put(_DONE)
+
+    async def _filtered(self, key):
+        if self.filtered is None:
+            return
+        try:
+            await self.filtered(key)
+        except Exception as e:
+            print(f"Faild to record filtered {key}: {e!r}")
+
+    async def _claim(self, key):
+        try:
+            won = await self.claim(key)
+            if won:
+                return True
+            if won is None:
+                print("Item filtered out - Skipping")
+                metrics.skip("filtered")
+            else:
+                print("Item claimed by another run - Skipping")
+                metrics.skip("claimed_elsewhere")
+        except Exception as e:
+            print(f"Faild to claim {key}: {e!r}")
+            metrics.skip("claim_failed")
+            self._failed(key, e)
+        return False
+
+    async def _send_worker(self):
+        batch = []
+        while True:
+            entry = await self._sendQueue.get()
+            if entry is not _DONE:
+                batch.append(entry)
+            if batch and (entry is _DONE or len(batch) >= self.batch_size):
+                await self._send(batch)
+                batch = []
+            if entry is _DONE:
+                await self._persistQueue.put(_DONE)
+                return
+
+    async def _send(self, batch):
+        # A rejected batch goes out again one by one, so only its bad items fail:
+        try:
+            if len(batch) > 1:
+                try:
+                    await self.send_batch(batch)
+                except self.unknown_outcome as e:
+                    await self._maybe_delivered([key for key, _ in batch], e)
+                    return
+                except Exception as e:
+                    print(
+                        f"Faild to send {len(batch)} items at once: {e} - Sending one by one"
+                    )
+                    metrics.count("batch_send_fallbacks")
+                else:
+                    for key, _ in batch:
+                        await self._delivered(key)
+                    return
+            for key, message in batch:
+                await self._send_one(key, message)
+        finally:
+            for _ in batch:
+                self._inFlight.release()
+
+    async def _send_one(self, key, message):
+        try:
+            await self.send(key, message)
+        except self.unknown_outcome as e:
+            await self._maybe_delivered([key], e)
+        except Exception as e:
+            print(f"Faild to send message to telegram: {e}")
+            metrics.skip("send_failed")
+            self._failed(key, e)
+            await self._release(key)
+        else:
+            await self._delivered(key)
+
+    async def _maybe_delivered(self, keys, error):
+        print(f"{error} - {len(keys)} items may be sent already, not sending again")
+        metrics.count("send_unconfirmed", len(keys))
+        for key in keys:
+            await self._delivered(key)
+
+    def _failed(self, key, error):
+        self.failed += 1
+        self.failures[key] = error
+
+    async def _delivered(self, key):
+        print(f"Message sended to telegram: {key}")
+        metrics.count("sent")
+        self.delivered += 1
+        await self._persistQueue.put(key)
+
+    async def _release(self, key):
+        try:
+            await self.release(key)
+        except Exception as e:
+            print(f"Faild to release {key}: {e!r}")
+
+    async def _persist_worker(self):
+        # Delivered keys are written in batches of whatever piled up meanwhile:
+        done = False
+        while not done:
+            keys = []
+            entry = await self._persistQueue.get()
+            while True:
+                if entry is _DONE:
+                    done = True
+                    break
+                keys.append(entry)
+                if self._persistQueue.empty():
+                    break
+                entry = self._persistQueue.get_nowait()
+            if keys:
+                try:
+                    await self.persist(keys)
+                except Exception as e:
+                    print(f"Faild to save {len(keys)} delivered items: {e!r}")
+                    metrics.count("save_failed", len(keys))
@@ -0,0 +1,110 @@
+import os
+import sys
+import time
+import array
+import struct
+import hashlib
+import threading
+from shared.state_store import STATE_DIR
+
+# Keys already in Mongo, kept next to the state files so a listing of known
+# items needs no query. Misses still go to Mongo, so a stale or lost snapshot
+# only costs lookups, it never makes an item look new or skips a new one:
+ENABLED = os.getenv("SEEN_SET", "1").lower() in ("1", "true", "yes")
+SEEN_DIR = os.getenv("SEEN_SET_DIR", os.path.join(STATE_DIR, "seen"))
+# Started over after this long, drops keys that left every listing long ago:
+MAX_AGE = float(os.getenv("SEEN_SET_MAX_AGE_HOURS", "168")) * 3600
+
+# Magic and creation time, then the sorted 64 bit key hashes:
+HEADER = struct.Struct("<4sd")
+MAGIC = b"SEEN"
+
+
+def key_hash(key):
+    # 64 bits keep collisions negligible for millions of keys:
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+class SeenSet:
+    # Hashes of keys known to be in one collection, shared by a process's runs:
+    def __init__(self, path, max_age=MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._hashes = set()
+        self._createdAt = time.time()
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "rb") as seenFile:
+                data = seenFile.read()
+        except FileNotFoundError:
+            return
+        if len(data) < HEADER.size:
+            return
+        magic, createdAt = HEADER.unpack_from(data)
+        if magic != MAGIC or time.time() - createdAt > self.max_age:
+            print(f"Seen set {os.path.basename(self.path)} is stale - Starting over")
+            self._dirty = True
+            return
+        hashes = array.array("Q")
+        body = data[HEADER.size :]
+        hashes.frombytes(body[: len(body) - len(body) % hashes.itemsize])
+        if sys.byteorder != "little":
+            hashes.byteswap()
+        self._hashes = set(hashes)
+        self._createdAt = createdAt
+
+    def unknown(self, keys):
+        # Keys that may be new, in the caller's order:
+        with self._lock:
+            return [key for key in keys if key_hash(key) not in self._hashes]
+
+    def add(self, keys):
+        hashes = {key_hash(key) for key in keys}
+        with self._lock:
+            if not hashes <= self._hashes:
+                self._hashes |= hashes
+                self._dirty = True
+
+    def discard(self, key):
+        keyHash = key_hash(key)
+        with self._lock:
+            if keyHash in self._hashes:
+                self._hashes.discard(keyHash)
+                self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            hashes = array.array("Q", sorted(self._hashes))
+            createdAt = self._createdAt
+            self._dirty = False
+        if sys.byteorder != "little":
+            hashes.byteswap()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmpPath = f"{self.path}.tmp"
+        with open(tmpPath, "wb") as seenFile:
+            seenFile.write(HEADER.pack(MAGIC, createdAt))
+            seenFile.write(hashes.tobytes())
+        os.replace(tmpPath, self.path)
+
+
+_seenSets = {}
+_seenSetsLock = threading.Lock()
+
+
+def get_seen_set(collection_name, field):
+    # One per collection, the Real Madrid sources share theirs:
+    if not ENABLED:
+        return None
+    with _seenSetsLock:
+        seenSet = _seenSets.get((collection_name, field))
+        if seenSet is None:
+            seenSet = SeenSet(os.path.join(SEEN_DIR, f"{collection_name}.{field}.bin"))
+            _seenSets[(collection_name, field)] = seenSet
+        return seenSet
@@ -0,0 +1,494 @@
+import os
+import re
+import html
+import asyncio
+import hashlib
+from datetime import datetime, timezone
+from functools import partial
+from shared.database_service import (
+    claim,
+    confirm,
+    get_collection,
+    lookup_keys,
+    release,
+)
+from shared.event_loop import run_sync
+from shared.html_parser import make_soup
+from shared.http_service import get_fetcher
+from shared.pipeline import Pipeline
+from shared.image_service import PREFETCH_IMAGES, prefetch_image
+from shared import metrics, near_duplicates
+from shared.seen_set import get_seen_set
+from shared.state_store import load_state, save_state
+from shared.translation_service import get_translator
+from shared.telegram_service import MEDIA_GROUP_SIZE, SendTimedOut, get_sender
+
+MINUTE = 60
+DB_NAME = "my_db"
+GROUP_THRESHOLD = int(os.getenv("TELEGRAM_GROUP_THRESHOLD", "5"))
+# Headlines are cut so a full digest stays under Telegram's 4096 characters:
+DIGEST_HEADLINE_CHARS = 200
+TAG_PATTERN = re.compile(r"<[^>]+>")
+# Why an item was stored as handled without being sent:
+SKIP_REASON_FIELD = "skip_reason"
+
+
+class Source:
+    # Identity and schedule:
+    name = ""
+    interval = 15 * MINUTE
+
+    # Listing page and storage:
+    news_url = ""
+    headers = {}
+    collection_name = ""
+    source_name = ""
+    key_field = "article_url"
+
+    # Parse only the parts of each page the hooks read (bs4 SoupStrainer):
+    listing_strainer = None
+    article_strainer = None
+
+    # Article fields translated to Arabic before rendering:
+    translated_fields = ()
+
+    # Article fields fingerprinted to skip stories another source already posted:
+    duplicate_fields = ()
+
+    # Telegram:
+    token_env = ""
+    extra_env = ()
+    message_kind = "photo"
+    # Fetch, check and upload photos ourselves instead of sending their url:
+    prefetch_images = PREFETCH_IMAGES
+    # A run with group_threshold or more new items sends them grouped,
+    # "album" (photo sources) as media groups or "digest" as one list of links:
+    group_mode = None
+    group_threshold = GROUP_THRESHOLD
+
+    def __init__(self):
+        self.env = {}
+        self.duplicates = None
+        self._fingerprints = {}
+        # Extra fields of the items stored as handled without a send:
+        self._skipped = {}
+        self._lateEntries = []
+        self._duplicatesSyncedAt = None
+        self._rechecks = 0
+        self._batchSize = 1
+        self.seen = None
+        # Metrics of the latest run:
+        self.metrics = None
+
+    def load_env(self):
+        names = [self.token_env, "TELEGRAM_CHAT_ID", "MONGO_URI", *self.extra_env]
+        self.env = {name: os.getenv(name) for name in names}
+        if not all(self.env.values()):
+            raise Exception("Missing environment variables")
+
+    @property
+    def token(self):
+        return self.env[self.token_env]
+
+    @property
+    def chat_id(self):
+        return self.env["TELEGRAM_CHAT_ID"]
+
+    # -------- Hooks for each source --------
+    def extract_links(self, soup):
+        # Article urls of the listing page, oldest first:
+        raise NotImplementedError
+
+    def parse_article(self, soup):
+        # Dict with the fields render_caption needs, or None:
+        raise NotImplementedError
+
+    def translate_article(self, article):
+        # All fields of an article go out as one cached, batched request:
+        fields = [field for field in self.translated_fields if article.get(field)]
+        if not fields:
+            return article
+        translated = get_translator().translate_many([article[f] for f in fields])
+        return {**article, **dict(zip(fields, translated))}
+
+    def render_caption(self, article):
+        raise NotImplementedError
+
+    # -------- Pipeline steps --------
+    def conditional_headers(self, state):
+        headers = {}
+        if state.get("etag"):
+            headers["If-None-Match"] = state["etag"]
+        if state.get("last_modified"):
+            headers["If-Modified-Since"] = state["last_modified"]
+        return headers
+
+    async def fetch_listing(self, fetcher, state):
+        # The listing, or None when it has not changed since the last clean run:
+        response = await fetcher.fetch_async(
+            self.news_url, headers={**self.headers, **self.conditional_headers(state)}
+        )
+        if response.status_code == 304:
+            print("Listing not modified - Exiting")
+            return None
+        return response
+
+    def listing_state(self, response, items):
+        return {
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "items_hash": self.items_hash(items),
+        }
+
+    async def restore_state(self):
+        return await asyncio.to_thread(load_state, self.name)
+
+    async def store_state(self, state):
+        await asyncio.to_thread(save_state, self.name, state)
+
+    def get_items(self, response):
+        # (key, payload) pairs, payload is whatever load_items needs besides the key:
+        if response.status_code != 200:
+            print(f"Faild to get listing page - CODE IS: {response.status_code}")
+            return []
+        links = self.extract_links(make_soup(response, self.listing_strainer))
+        return [(url, None) for url in dict.fromkeys(links) if url]
+
+    async def load_item(self, fetcher, key, payload):
+        try:
+            return await fetcher.fetch_async(key, headers=self.headers)
+        except Exception as e:
+            print(f"Faild to fetch {key}: {e!r}")
+            return None
+
+    async def prepare_item(self, fetcher, key, payload):
+        # Fetch, parse and translate one item, other items run alongside it:
+        with metrics.stage("article_fetch"):
+            page = await self.load_item(fetcher, key, payload)
+        try:
+            message = await asyncio.to_thread(self.build_message, key, page)
+            if message and self.message_kind == "photo" and self.prefetch_images:
+                with metrics.stage("image_fetch"):
+                    message = await self.prefetch_photo(fetcher, message)
+            return message
+        except Exception as e:
+            print(f"Faild to build message for {key}: {e!r}")
+            return None
+
+    async def prefetch_photo(self, fetcher, message):
+        # Bytes to upload, unless this bot already has a file_id for the image:
+        photoUrl = message["photo_url"]
+        sender = get_sender(self.token)
+        if await asyncio.to_thread(sender.cached_file_id, photoUrl):
+            return message
+        try:
+            photo = await prefetch_image(fetcher, photoUrl, headers=self.headers)
+        except Exception as e:
+            # Telegram fetches the url itself then, as it did without prefetching:
+            print(f"Faild to prefetch image {photoUrl}: {e!r} - Sending its url")
+            metrics.count("image_prefetch_failed")
+            return message
+        return {**message, "photo_file": photo}
+
+    def build_message(self, key, page):
+        # Message kwargs for the send queue, None when it faild to build,
+        # or False when the item is filtered out on purpose:
+        if page is None or page.status_code != 200:
+            return None
+        with metrics.stage("parse"):
+            article = self.parse_article(make_soup(page, self.article_strainer))
+        if not article or not article.get("image"):
+            # Loaded fine but nothing to post (video or live pages), not worth a retry:
+            print("Article has no content or image - Skipping")
+            metrics.skip("unparseable")
+            self._skipped[key] = {SKIP_REASON_FIELD: "unparseable"}
+            return False
+        if self.is_near_duplicate(key, article):
+            return False
+        with metrics.stage("translate"):
+            article = self.translate_article(article)
+        return {
+            "caption": self.render_caption(article),
+            "photo_url": article["image"],
+        }
+
+    async def claim_item(self, collection, key):
+        with metrics.stage("claim"):
+            original = await self.recheck_duplicate(collection, key)
+            if original:
+                print(f"Near duplicate of {original} claimed meanwhile - Skipping")
+                metrics.skip("near_duplicate")
+                self._skipped[key] = {near_duplicates.DUPLICATE_OF_FIELD: original}
+                await self.record_filtered(collection, key)
+                return None
+            return await asyncio.to_thread(
+                claim, collection, self.key_field, self.claim_document(key)
+            )
+
+    async def send_item(self, sender, key, message):
+        with metrics.stage("send"):
+            await sender.send_with_retry(
+                self.message_kind,
+                self.chat_id,
+                source_url=self.source_url(key),
+                **message,
+            )
+
+    async def send_items(self, sender, entries):
+        # One album or digest for a whole batch of (key, message) pairs:
+        with metrics.stage("send"):
+            if self.group_mode == "album":
+                photos = [
+                    {**message, "source_url": self.source_url(key)}
+                    for key, message in entries
+                ]
+                await sender.send_with_retry("album", self.chat_id, photos=photos)
+            else:
+                text = self.render_digest(entries)
+                await sender.send_with_retry("digest", self.chat_id, text=text)
+
+    def headline(self, message):
+        # First line of the caption or text, without its markup:
+        body = message.get("caption") or message.get("text") or ""
+        headline = TAG_PATTERN.sub("", body.strip().split("\n")[0]).strip()
+        if len(headline) > DIGEST_HEADLINE_CHARS:
+            headline = f"{headline[:DIGEST_HEADLINE_CHARS]}..."
+        return headline
+
+    def render_digest(self, entries):
+        return "\n\n".join(
+            f'• <a href="{html.escape(self.source_url(key))}">'
+            f"{self.headline(message)}</a>"
+            for key, message in entries
+        )
+
+    def group_size(self, count):
+        # Items per send for a run with count new items, 1 sends them one by one:
+        if not self.group_mode or count < self.group_threshold:
+            return 1
+        if self.group_mode == "album" and self.message_kind != "photo":
+            return 1
+        return MEDIA_GROUP_SIZE
+
+    async def release_item(self, collection, key):
+        # An undelivered item is free for the next run again:
+        with metrics.stage("release"):
+            await asyncio.to_thread(release, collection, self.key_field, key)
+        if self.seen:
+            self.seen.discard(key)
+
+    async def persist_items(self, collection, keys):
+        with metrics.stage("save"):
+            await asyncio.to_thread(confirm, collection, self.key_field, keys)
+        self.remember_seen(keys)
+
+    def remember_seen(self, keys):
+        # Only keys the database holds, anything else has to be asked again:
+        if self.seen:
+            self.seen.add(keys)
+
+    async def load_duplicates(self, collection, batch_size=1):
+        # Fingerprints of the stories every source claimed within the window:
+        self._skipped = {}
+        self._lateEntries = []
+        self._rechecks = 0
+        self._batchSize = batch_size
+        if not self.duplicate_fields or not near_duplicates.ENABLED:
+            self.duplicates = None
+            return
+        self._duplicatesSyncedAt = datetime.now(timezone.utc)
+        recent = await asyncio.to_thread(
+            near_duplicates.load_recent, collection, self.key_field
+        )
+        self.duplicates = near_duplicates.NearDuplicateIndex(recent)
+
+    async def recheck_duplicate(self, collection, key):
+        # Sources on the same tick (AS and Marca) claim the same story while this
+        # run parses, so compare against what was claimed since the index loaded:
+        fingerprint = self._fingerprints.get(key)
+        if self.duplicates is None or fingerprint is None:
+            return None
+        # Read once per send batch, the batch's later claims reuse it:
+        if self._rechecks % self._batchSize == 0:
+            since = self._duplicatesSyncedAt - near_duplicates.CLOCK_SKEW
+            self._duplicatesSyncedAt = datetime.now(timezone.utc)
+            self._lateEntries.extend(
+                await asyncio.to_thread(
+                    near_duplicates.load_recent, collection, self.key_field, since
+                )
+            )
+        self._rechecks += 1
+        return near_duplicates.find_duplicate(key, fingerprint, self._lateEntries)
+
+    async def record_filtered(self, collection, key):
+        # A skipped item is stored as handled, so later ticks never fetch it again
+        # (a near-duplicate not even once its original leaves the window):
+        fields = self._skipped.pop(key, None)
+        if fields is None:
+            return
+        self._fingerprints.pop(key, None)
+        document = {self.key_field: key, "source": self.source_name, **fields}
+        if await asyncio.to_thread(claim, collection, self.key_field, document):
+            await asyncio.to_thread(confirm, collection, self.key_field, [key])
+            self.remember_seen([key])
+
+    def is_near_duplicate(self, key, article):
+        # Runs right after parsing, before any translation or send:
+        if self.duplicates is None:
+            return False
+        fingerprint = near_duplicates.fingerprint(article, self.duplicate_fields)
+        if fingerprint is None:
+            return False
+        original = self.duplicates.check_and_add(key, fingerprint)
+        if original:
+            print(f"Near duplicate of {original} - Skipping")
+            metrics.skip("near_duplicate")
+            self._skipped[key] = {near_duplicates.DUPLICATE_OF_FIELD: original}
+            return True
+        self._fingerprints[key] = fingerprint
+        return False
+
+    def state_after_failures(self, state, newState, failed):
+        # State to store after a run where (key, payload, error) items faild.
+        # None keeps the old one, only a run without failures may skip this
+        # listing next time:
+        return None
+
+    def items_hash(self, items):
+        keys = "\n".join(key for key, _ in items)
+        return hashlib.sha256(keys.encode("utf-8")).hexdigest()
+
+    def source_url(self, key):
+        return key
+
+    def claim_document(self, key):
+        document = {self.key_field: key, "source": self.source_name}
+        fingerprint = self._fingerprints.pop(key, None)
+        if fingerprint is not None:
+            document[near_duplicates.FINGERPRINT_FIELD] = sorted(fingerprint)
+        return document
+
+    async def run(self):
+        # Every run leaves a report of its stage timings and item counts:
+        runMetrics, token = metrics.start_run(self.name)
+        self.metrics = runMetrics
+        try:
+            await self.process()
+        except Exception:
+            runMetrics.count("run_errors")
+            raise
+        finally:
+            runMetrics.finish()
+            metrics.end_run(token)
+            try:
+                await asyncio.to_thread(metrics.write_reports, runMetrics)
+            except Exception as e:
+                print(f"Faild to write run report: {e!r}")
+
+    async def process(self):
+        self.load_env()
+        fetcher = get_fetcher()
+
+        print(f"{self.name} Script is Running...")
+        state = await self.restore_state()
+        with metrics.stage("list_fetch"):
+            listing = await self.fetch_listing(fetcher, state)
+        if listing is None:
+            metrics.skip("listing_not_fetched")
+            return
+        with metrics.stage("list_parse"):
+            items = await asyncio.to_thread(self.get_items, listing)
+        newState = self.listing_state(listing, items)
+        metrics.count("seen", len(items))
+        if not items:
+            print("No items found - Exiting")
+            await self.store_state(newState)
+            return
+
+        # Same links as the last clean run, nothing new to look up:
+        if newState["items_hash"] == state.get("items_hash"):
+            print("Listing unchanged - Exiting")
+            metrics.skip("listing_unchanged", len(items))
+            await self.store_state(newState)
+            return
+
+        # Keys this machine already knows are in the database skip the query:
+        keys = [key for key, _ in items]
+        self.seen = await asyncio.to_thread(
+            get_seen_set, self.collection_name, self.key_field
+        )
+        candidates = self.seen.unknown(keys) if self.seen else keys
+        print(f"{len(keys) - len(candidates)} items seen before - Skipping")
+        metrics.skip("seen_locally", len(keys) - len(candidates))
+        if not candidates:
+            print("No new items - Exiting")
+            await self.store_state(newState)
+            return
+
+        print("Getting articles from database...")
+        with metrics.stage("db_lookup"):
+            collection = await asyncio.to_thread(
+                get_collection,
+                uri=self.env["MONGO_URI"],
+                db_name=DB_NAME,
+                collection_name=self.collection_name,
+                unique_key=self.key_field,
+            )
+            unseenKeys, settledKeys = await asyncio.to_thread(
+                lookup_keys, collection, self.key_field, candidates
+            )
+        unseenKeys = set(unseenKeys)
+        print(f"{len(candidates) - len(unseenKeys)} items in database - Skipping")
+        metrics.skip("in_database", len(candidates) - len(unseenKeys))
+        metrics.count("new", len(unseenKeys))
+        # Pending claims of other runs may still be released, only settled keys stick:
+        self.remember_seen(settledKeys)
+        items = [(key, payload) for key, payload in items if key in unseenKeys]
+        if not items:
+            print("No new items - Exiting")
+            if self.seen:
+                await asyncio.to_thread(self.seen.save)
+            await self.store_state(newState)
+            return
+
+        groupSize = self.group_size(len(items))
+        await self.load_duplicates(collection, groupSize)
+
+        # Fetch, claim, send and save overlap, sends keep the listing order:
+        sender = get_sender(self.token)
+        pipeline = Pipeline(
+            prepare=partial(self.prepare_item, fetcher),
+            claim=partial(self.claim_item, collection),
+            send=partial(self.send_item, sender),
+            release=partial(self.release_item, collection),
+            persist=partial(self.persist_items, collection),
+            filtered=partial(self.record_filtered, collection),
+            send_batch=partial(self.send_items, sender),
+            batch_size=groupSize,
+            unknown_outcome=(SendTimedOut,),
+        )
+        print(f"Process {len(items)} items - Working...")
+        if groupSize > 1:
+            print(f"Burst of {len(items)} items - Sending as {self.group_mode}s")
+        delivered, failed = await pipeline.run(items)
+        if self.seen:
+            await asyncio.to_thread(self.seen.save)
+        print(f"\nMessages sended to telegram: {delivered}, faild: {failed}")
+        metrics.count("failed", failed)
+
+        if self.translated_fields:
+            print(f"Translation stats: {get_translator().backend.stats()}")
+        if failed:
+            failedItems = [
+                (key, payload, pipeline.failures[key])
+                for key, payload in items
+                if key in pipeline.failures
+            ]
+            newState = self.state_after_failures(state, newState, failedItems)
+        if newState:
+            await self.store_state(newState)
+        print("\n✅ All Done - Exiting")
+
+
+def run_source(source):
+    run_sync(source.run())
@@ -0,0 +1,26 @@
+import os
+import json
+
+# Small per-source state files, kept between cron runs by the workflow cache:
+STATE_DIR = os.getenv("STATE_DIR", ".state")
+
+
+def _state_path(name):
+    return os.path.join(STATE_DIR, f"{name}.json")
+
+
+def load_state(name):
+    try:
+        with open(_state_path(name), encoding="utf-8") as stateFile:
+            return json.load(stateFile)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def save_state(name, state):
+    os.makedirs(STATE_DIR, exist_ok=True)
+    path = _state_path(name)
+    tmpPath = f"{path}.tmp"
+    with open(tmpPath, "w", encoding="utf-8") as stateFile:
+        json.dump(state, stateFile, ensure_ascii=False)
+    os.replace(tmpPath, path)
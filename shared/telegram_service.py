@@ -1,34 +1,288 @@
-import telegram
-from telegram import InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.constants import ParseMode
+import os
+import html
+import atexit
+import random
+import asyncio
+from shared import metrics
+from shared.event_loop import run_sync
+from shared.image_service import get_file_id_cache
 
+PHOTO_BUTTON_TEXT = "الخبر كامل من الموقع الرسمي"
+TEXT_BUTTON_TEXT = "CVE Detail"
+CONNECTION_POOL_SIZE = 8
+# Telegram fetches photo urls while the request waits, an album takes a while:
+READ_TIMEOUT = 30.0
+MEDIA_WRITE_TIMEOUT = 60.0
+# Telegram takes 2 to 10 photos per media group:
+MEDIA_GROUP_SIZE = 10
+# Bot API server, a local one for benchmarks or a self-hosted Bot API:
+API_URL = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
 
-async def send_photo_message(token, chat_id, caption, photo_url, source_url):
-    bot = telegram.Bot(token)
+# Telegram limits: ~30 messages/s per bot, 20/min in groups, ~1/s in private chats:
+GLOBAL_SEND_INTERVAL = 1 / 25
+GROUP_SEND_INTERVAL = 3.0
+PRIVATE_SEND_INTERVAL = 1.0
+MAX_SEND_ATTEMPTS = 5
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+
+
+class _RateLimiter:
+    def __init__(self, interval):
+        self.interval = interval
+        self._nextSlot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        async with self._lock:
+            now = asyncio.get_running_loop().time()
+            if self._nextSlot > now:
+                await asyncio.sleep(self._nextSlot - now)
+                now = self._nextSlot
+            self._nextSlot = now + self.interval
+
+    def delay(self, seconds):
+        now = asyncio.get_running_loop().time()
+        self._nextSlot = max(self._nextSlot, now + seconds)
+
+
+class SendTimedOut(Exception):
+    # A send timed out after its request went out, Telegram may have posted it:
+    pass
+
+
+def _request_sent(error):
+    # Connect and pool timeouts fail before anything reaches Telegram:
+    import httpx
+
+    return not isinstance(error.__cause__, (httpx.ConnectTimeout, httpx.PoolTimeout))
+
+
+def _retry_after_seconds(error):
+    retryAfter = error.retry_after
+    if hasattr(retryAfter, "total_seconds"):
+        return retryAfter.total_seconds()
+    return float(retryAfter)
+
+
+def _reply_markup(button_text, url):
+    from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+    return InlineKeyboardMarkup([[InlineKeyboardButton(button_text, url=url)]])
+
+
+def _backoff_delay(attempt):
+    # Full jitter, so parallel retries don't hit Telegram in lockstep:
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))
+
+
+class TelegramSender:
+    # One Bot, one HTTP connection pool and one getMe call per token.
+    # python-telegram-bot is imported with the first sender, not with this module:
+    def __init__(self, token, connection_pool_size=CONNECTION_POOL_SIZE):
+        from telegram import Bot
+        from telegram.request import HTTPXRequest
+
+        self.bot = Bot(
+            token,
+            base_url=f"{API_URL}/bot",
+            base_file_url=f"{API_URL}/file/bot",
+            request=HTTPXRequest(
+                connection_pool_size=connection_pool_size,
+                read_timeout=READ_TIMEOUT,
+                media_write_timeout=MEDIA_WRITE_TIMEOUT,
+            ),
+        )
+        self._initialized = False
+        self._botId = token.split(":")[0]
+        self._fileIds = get_file_id_cache()
+        self._globalLimiter = _RateLimiter(GLOBAL_SEND_INTERVAL)
+        self._chatLimiters = {}
+
+    def _chat_limiter(self, chat_id):
+        limiter = self._chatLimiters.get(chat_id)
+        if limiter is None:
+            isGroup = str(chat_id).startswith("-")
+            limiter = _RateLimiter(
+                GROUP_SEND_INTERVAL if isGroup else PRIVATE_SEND_INTERVAL
+            )
+            self._chatLimiters[chat_id] = limiter
+        return limiter
+
+    async def send_with_retry(self, kind, chat_id, **kwargs):
+        from telegram.error import (
+            BadRequest,
+            NetworkError,
+            RetryAfter,
+            TelegramError,
+            TimedOut,
+        )
 
-    keyboard = [[InlineKeyboardButton("الخبر كامل من الموقع الرسمي", url=source_url)]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+        send = {
+            "photo": self.send_photo_async,
+            "text": self.send_text_async,
+            "album": self.send_album_async,
+            "digest": self.send_digest_async,
+        }[kind]
+        chatLimiter = self._chat_limiter(chat_id)
+        for attempt in range(MAX_SEND_ATTEMPTS):
+            await chatLimiter.wait()
+            await self._globalLimiter.wait()
+            try:
+                return await send(chat_id=chat_id, **kwargs)
+            except RetryAfter as e:
+                delay = _retry_after_seconds(e)
+                print(f"Telegram flood control - Retrying in {delay}s")
+                metrics.count("telegram_flood_waits")
+                chatLimiter.delay(delay)
+                self._globalLimiter.delay(delay)
+            except BadRequest:
+                raise
+            except NetworkError as e:
+                # Sends are not safe to repeat, a resend could post the message twice:
+                if isinstance(e, TimedOut) and _request_sent(e):
+                    raise SendTimedOut(f"Telegram timed out: {e}") from e
+                if attempt == MAX_SEND_ATTEMPTS - 1:
+                    raise
+                delay = _backoff_delay(attempt)
+                print(f"Telegram network error: {e} - Retrying in {delay:.1f}s")
+                metrics.count("telegram_retries")
+                await asyncio.sleep(delay)
+        raise TelegramError(f"Message not sent after {MAX_SEND_ATTEMPTS} attempts")
 
-    async with bot:
-        await bot.send_photo(
+    async def _ensure_initialized(self):
+        if not self._initialized:
+            await self.bot.initialize()
+            self._initialized = True
+
+    def cached_file_id(self, photo_url):
+        return self._fileIds.get(self._botId, photo_url)
+
+    async def send_photo_async(
+        self,
+        chat_id,
+        caption,
+        photo_url,
+        source_url,
+        button_text=PHOTO_BUTTON_TEXT,
+        photo_file=None,
+    ):
+        # An image this bot sent before goes by file_id, then prefetched bytes, then the url:
+        await self._ensure_initialized()
+        fileId = await asyncio.to_thread(self.cached_file_id, photo_url)
+        message = await self.bot.send_photo(
             chat_id=chat_id,
-            photo=photo_url,
+            photo=fileId or photo_file or photo_url,
             caption=caption,
-            reply_markup=reply_markup,
-            parse_mode=ParseMode.HTML,
+            reply_markup=_reply_markup(button_text, source_url),
+            parse_mode="HTML",
         )
+        if not fileId and message.photo:
+            await asyncio.to_thread(
+                self._fileIds.set, self._botId, photo_url, message.photo[-1].file_id
+            )
+        return message
 
+    async def send_album_async(self, chat_id, photos, button_text=PHOTO_BUTTON_TEXT):
+        # Up to MEDIA_GROUP_SIZE photo messages in one call. Albums take no
+        # buttons, so each caption links its article instead:
+        from telegram import InputMediaPhoto
 
-async def send_text_message(token, chat_id, text, source_url):
-    bot = telegram.Bot(token)
+        await self._ensure_initialized()
+        fileIds = await asyncio.to_thread(
+            lambda: [self.cached_file_id(photo["photo_url"]) for photo in photos]
+        )
+        media = [
+            InputMediaPhoto(
+                media=fileId or photo.get("photo_file") or photo["photo_url"],
+                caption=(
+                    f"{photo['caption']}\n\n"
+                    f'<a href="{html.escape(photo["source_url"])}">{button_text}</a>'
+                ),
+                parse_mode="HTML",
+            )
+            for photo, fileId in zip(photos, fileIds)
+        ]
+        messages = await self.bot.send_media_group(chat_id=chat_id, media=media)
+        newFileIds = [
+            (photo["photo_url"], message.photo[-1].file_id)
+            for photo, fileId, message in zip(photos, fileIds, messages)
+            if not fileId and message.photo
+        ]
+        for photoUrl, newFileId in newFileIds:
+            await asyncio.to_thread(self._fileIds.set, self._botId, photoUrl, newFileId)
+        return messages
 
-    keyboard = [[InlineKeyboardButton("CVE Detail", url=source_url)]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    async def send_digest_async(self, chat_id, text):
+        # One text message standing in for several items, its links are the items:
+        await self._ensure_initialized()
+        return await self.bot.send_message(
+            chat_id=chat_id, text=text, parse_mode="HTML"
+        )
 
-    async with bot:
-        await bot.send_message(
+    async def send_text_async(
+        self, chat_id, text, source_url, button_text=TEXT_BUTTON_TEXT
+    ):
+        await self._ensure_initialized()
+        return await self.bot.send_message(
             chat_id=chat_id,
             text=text,
-            reply_markup=reply_markup,
-            parse_mode=ParseMode.HTML,
+            reply_markup=_reply_markup(button_text, source_url),
+            parse_mode="HTML",
         )
+
+    async def close_async(self):
+        if self._initialized:
+            await self.bot.shutdown()
+            self._initialized = False
+
+    def send_photo(self, **kwargs):
+        return run_sync(self.send_photo_async(**kwargs))
+
+    def send_text(self, **kwargs):
+        return run_sync(self.send_text_async(**kwargs))
+
+    def close(self):
+        if self._initialized:
+            run_sync(self.close_async())
+
+
+_senders = {}
+
+
+def get_sender(token):
+    sender = _senders.get(token)
+    if sender is None:
+        sender = TelegramSender(token)
+        _senders[token] = sender
+    return sender
+
+
+def close_senders():
+    while _senders:
+        _, sender = _senders.popitem()
+        try:
+            sender.close()
+        except Exception as e:
+            print(f"Telegram sender not closed cleanly: {e}")
+
+
+# Registered after shared.event_loop, so it runs before the loop is closed:
+atexit.register(close_senders)
+
+
+async def send_photo_message(token, chat_id, caption, photo_url, source_url):
+    await get_sender(token).send_photo_async(
+        chat_id=chat_id,
+        caption=caption,
+        photo_url=photo_url,
+        source_url=source_url,
+    )
+
+
+async def send_text_message(token, chat_id, text, source_url):
+    await get_sender(token).send_text_async(
+        chat_id=chat_id,
+        text=text,
+        source_url=source_url,
+    )
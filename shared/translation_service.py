@@ -0,0 +1,348 @@
+import os
+import re
+import time
+import queue
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from shared import metrics
+from shared.state_store import STATE_DIR
+
+# Google's free endpoint takes up to 5000 characters per request:
+MAX_CHARS = 4500
+SEPARATOR_MARK = "@@@"
+SEPARATOR = f"\n{SEPARATOR_MARK}\n"
+SEPARATOR_PATTERN = re.compile(rf"\s*{re.escape(SEPARATOR_MARK)}\s*")
+
+MEMORY_CACHE_SIZE = 2048
+DISK_CACHE_SIZE = 50000
+DISK_CACHE_PATH = os.path.join(STATE_DIR, "translations.sqlite")
+
+# Backend selection and failure handling:
+BACKEND = os.getenv("TRANSLATION_BACKEND", "google")
+TIMEOUT = float(os.getenv("TRANSLATION_TIMEOUT", "10"))
+LOCAL_DELAY = float(os.getenv("TRANSLATION_LOCAL_DELAY", "0"))
+FAILURE_THRESHOLD = 3
+CIRCUIT_RESET_AFTER = 60
+
+
+class TranslationUnavailable(Exception):
+    pass
+
+
+class TranslationBackend:
+    name = ""
+
+    def __init__(self, source, target):
+        self.source = source
+        self.target = target
+
+    def translate(self, text):
+        raise NotImplementedError
+
+
+class GoogleBackend(TranslationBackend):
+    name = "google"
+
+    def translate(self, text):
+        # GoogleTranslator keeps request params on itself, so one per call.
+        # Imported here, most runs translate nothing:
+        from deep_translator import GoogleTranslator
+
+        return GoogleTranslator(source=self.source, target=self.target).translate(text)
+
+
+class LocalBackend(TranslationBackend):
+    # Deterministic, offline stand-in for tests and benchmarks:
+    name = "local"
+
+    def __init__(self, source, target, delay=LOCAL_DELAY):
+        super().__init__(source, target)
+        self.delay = delay
+
+    def translate(self, text):
+        if self.delay:
+            time.sleep(self.delay)
+        return "\n".join(
+            (
+                f"[{self.target}] {line}"
+                if line.strip() not in ("", SEPARATOR_MARK)
+                else line
+            )
+            for line in text.split("\n")
+        )
+
+
+BACKENDS = {backend.name: backend for backend in (GoogleBackend, LocalBackend)}
+
+
+class GuardedBackend:
+    # Timeout, circuit breaker and latency stats around any backend:
+    def __init__(
+        self,
+        backend,
+        timeout=TIMEOUT,
+        failure_threshold=FAILURE_THRESHOLD,
+        reset_after=CIRCUIT_RESET_AFTER,
+    ):
+        self.backend = backend
+        self.name = backend.name
+        self.timeout = timeout
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self._lock = threading.Lock()
+        self._consecutiveFailures = 0
+        self._openUntil = 0.0
+        self._stats = {"calls": 0, "failures": 0, "rejected": 0, "seconds": 0.0}
+        self._maxSeconds = 0.0
+
+    def translate(self, text):
+        with self._lock:
+            if time.monotonic() < self._openUntil:
+                self._stats["rejected"] += 1
+                raise TranslationUnavailable(f"{self.name} circuit open")
+
+        startedAt = time.monotonic()
+        try:
+            result = self._call_with_timeout(text)
+        except Exception as e:
+            self._record(time.monotonic() - startedAt, failed=True)
+            raise TranslationUnavailable(f"{self.name} failed: {e!r}") from e
+        self._record(time.monotonic() - startedAt, failed=False)
+        return result
+
+    def _call_with_timeout(self, text):
+        # Daemon thread, so a hung request can neither block the run nor the exit:
+        results = queue.Queue(maxsize=1)
+
+        def call():
+            try:
+                results.put((True, self.backend.translate(text)))
+            except Exception as e:
+                results.put((False, e))
+
+        threading.Thread(target=call, daemon=True).start()
+        try:
+            ok, value = results.get(timeout=self.timeout)
+        except queue.Empty:
+            raise TimeoutError(f"timed out after {self.timeout}s")
+        if not ok:
+            raise value
+        return value
+
+    def _record(self, seconds, failed):
+        with self._lock:
+            self._stats["calls"] += 1
+            self._stats["seconds"] += seconds
+            self._maxSeconds = max(self._maxSeconds, seconds)
+            if not failed:
+                self._consecutiveFailures = 0
+                return
+            self._stats["failures"] += 1
+            self._consecutiveFailures += 1
+            if self._consecutiveFailures >= self.failure_threshold:
+                print(f"Translation backend {self.name} failing - Pausing it")
+                self._openUntil = time.monotonic() + self.reset_after
+
+    def stats(self):
+        with self._lock:
+            calls = self._stats["calls"]
+            return {
+                "backend": self.name,
+                **self._stats,
+                "avg_seconds": self._stats["seconds"] / calls if calls else 0.0,
+                "max_seconds": self._maxSeconds,
+            }
+
+
+def make_backend(name=BACKEND, source="auto", target="ar"):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown translation backend: {name}")
+    return GuardedBackend(BACKENDS[name](source, target))
+
+
+def _cache_key(backend, source, target, text):
+    key = f"{backend}:{source}:{target}:{text}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class TranslationCache:
+    # In-memory LRU in front of a small sqlite file that survives between runs:
+    def __init__(
+        self,
+        path=DISK_CACHE_PATH,
+        memory_size=MEMORY_CACHE_SIZE,
+        disk_size=DISK_CACHE_SIZE,
+    ):
+        self.path = path
+        self.memory_size = memory_size
+        self.disk_size = disk_size
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+    def _get_db(self):
+        if self._db is None and self.path:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS translations "
+                "(key TEXT PRIMARY KEY, value TEXT, used_at REAL)"
+            )
+        return self._db
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def get_many(self, keys):
+        found = {}
+        with self._lock:
+            missing = []
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                else:
+                    missing.append(key)
+
+            db = self._get_db()
+            if missing and db:
+                placeholders = ",".join("?" * len(missing))
+                rows = db.execute(
+                    f"SELECT key, value FROM translations WHERE key IN ({placeholders})",
+                    missing,
+                ).fetchall()
+                for key, value in rows:
+                    found[key] = value
+                    self._remember(key, value)
+        return found
+
+    def set_many(self, values):
+        if not values:
+            return
+        with self._lock:
+            for key, value in values.items():
+                self._remember(key, value)
+
+            db = self._get_db()
+            if db:
+                with db:
+                    db.executemany(
+                        "INSERT OR REPLACE INTO translations VALUES "
+                        "(?, ?, strftime('%s', 'now'))",
+                        values.items(),
+                    )
+                    # Drop the oldest rows once the file grows past disk_size:
+                    db.execute(
+                        "DELETE FROM translations WHERE key NOT IN "
+                        "(SELECT key FROM translations ORDER BY used_at DESC LIMIT ?)",
+                        (self.disk_size,),
+                    )
+
+    def close(self):
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+class Translator:
+    def __init__(self, source="auto", target="ar", cache=None, backend=None):
+        self.source = source
+        self.target = target
+        self.cache = cache if cache is not None else TranslationCache()
+        self.backend = backend or make_backend(source=source, target=target)
+
+    def translate(self, text):
+        return self.translate_many([text])[0]
+
+    def translate_many(self, texts):
+        # Cached texts are free, the rest go out in as few requests as possible:
+        keys = [
+            _cache_key(self.backend.name, self.source, self.target, text)
+            for text in texts
+        ]
+        translated = self.cache.get_many(set(keys))
+        metrics.count("translation_cache_hits", len(translated))
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if not text or not text.strip():
+                translated[key] = text
+            elif key not in translated:
+                missing[key] = text
+
+        metrics.count("translation_cache_misses", len(missing))
+        if missing:
+            results = self._translate_uncached(list(missing.values()))
+            newValues = dict(zip(missing, results))
+            self.cache.set_many(newValues)
+            translated.update(newValues)
+        return [translated[key] for key in keys]
+
+    def _translate_uncached(self, texts):
+        results = []
+        for batch in self._batches(texts):
+            results.extend(self._translate_batch(batch))
+        return results
+
+    def _batches(self, texts):
+        batch = []
+        batchLength = 0
+        for text in texts:
+            length = len(text) + len(SEPARATOR)
+            if batch and batchLength + length > MAX_CHARS:
+                yield batch
+                batch = []
+                batchLength = 0
+            batch.append(text)
+            batchLength += length
+        if batch:
+            yield batch
+
+    def _translate_batch(self, texts):
+        if len(texts) == 1:
+            return [self._translate_text(texts[0])]
+
+        joined = self.backend.translate(SEPARATOR.join(texts))
+        parts = SEPARATOR_PATTERN.split(joined or "")
+        if len(parts) == len(texts):
+            return parts
+        # The separator did not survive translation, fall back to one per text:
+        return [self._translate_text(text) for text in texts]
+
+    def _translate_text(self, text):
+        if len(text) <= MAX_CHARS:
+            return self.backend.translate(text)
+
+        # Longer texts are split on line boundaries:
+        chunks = []
+        chunk = ""
+        for line in text.split("\n"):
+            while len(line) > MAX_CHARS:
+                chunks.append(line[:MAX_CHARS])
+                line = line[MAX_CHARS:]
+            if chunk and len(chunk) + len(line) + 1 > MAX_CHARS:
+                chunks.append(chunk)
+                chunk = ""
+            chunk = f"{chunk}\n{line}" if chunk else line
+        if chunk:
+            chunks.append(chunk)
+        return "\n".join(self.backend.translate(chunk) for chunk in chunks)
+
+
+_translators = {}
+_translatorsLock = threading.Lock()
+
+
+def get_translator(source="auto", target="ar"):
+    with _translatorsLock:
+        translator = _translators.get((source, target))
+        if translator is None:
+            translator = Translator(source=source, target=target)
+            _translators[(source, target)] = translator
+        return translator